@@ -33,9 +33,26 @@ class IntegrationsConfig(BaseModel):
     telegram: TelegramConfig | None = None
 
 
+class ChatRule(BaseModel):
+    name: str
+    group: str | None = None
+
+    keywords: list[str] = []
+    prefix: str | None = None
+    regex: str | None = None
+
+    chatter_login_contains: str | None = None
+    excluded_chatter_logins: list[str] = []
+
+    response: str | None = None
+    ai: bool = False
+    ai_coalesce: bool = False
+
+
 class StreamerConfig(BaseModel):
     twitch: TwitchConfig
     notifications: NotificationsConfig
     integrations: IntegrationsConfig
 
     chatbot_in_chats: list[int] | None = None
+    chat_rules: list[ChatRule] | None = None
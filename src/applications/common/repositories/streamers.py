@@ -1,19 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import Any
+
 from applications.common.domain.streamers import StreamerConfig
+from core.config import config
 
 from .base import BaseRepository
 
 
+logger = logging.getLogger(__name__)
+
+
+class StreamersSnapshot:
+    def __init__(self, streamers: dict[Any, StreamerConfig]):
+        self.streamers = streamers
+
+        self.by_twitch_id: dict[int, StreamerConfig] = {}
+        self.by_games_list_channel: dict[tuple[int, int], StreamerConfig] = {}
+        self.by_chatbot_chat_id: dict[int, list[StreamerConfig]] = {}
+
+        for streamer in streamers.values():
+            self.by_twitch_id[streamer.twitch.id] = streamer
+
+            if (discord := streamer.integrations.discord) is not None and discord.games_list is not None:
+                self.by_games_list_channel[(discord.guild_id, discord.games_list.channel_id)] = streamer
+
+            for chat_id in streamer.chatbot_in_chats or []:
+                self.by_chatbot_chat_id.setdefault(chat_id, []).append(streamer)
+
+    @classmethod
+    def from_docs(cls, docs: list[dict]) -> "StreamersSnapshot":
+        return cls({doc["_id"]: StreamerConfig(**doc) for doc in docs})
+
+    def with_change(self, change: dict) -> "StreamersSnapshot":
+        streamers = dict(self.streamers)
+        doc_id = change["documentKey"]["_id"]
+
+        if (doc := change.get("fullDocument")) is not None:
+            streamers[doc_id] = StreamerConfig(**doc)
+        else:
+            streamers.pop(doc_id, None)
+
+        return StreamersSnapshot(streamers)
+
+
+class StreamerConfigCache:
+    def __init__(self):
+        self.snapshot: StreamersSnapshot | None = None
+        self.loaded_at: float = 0
+
+        self.watching = False
+
+        self._lock = asyncio.Lock()
+        self._watch_task: asyncio.Task | None = None
+
+    def _is_fresh(self) -> bool:
+        if self.snapshot is None:
+            return False
+
+        if self.watching:
+            return True
+
+        return time.monotonic() - self.loaded_at < config.STREAMERS_CACHE_TTL
+
+    async def _load(self):
+        async with StreamerConfigRepository.connect() as collection:
+            cursor = await collection.find()
+            docs = [doc async for doc in cursor]
+
+        self.snapshot = StreamersSnapshot.from_docs(docs)
+        self.loaded_at = time.monotonic()
+
+    async def _apply_change(self, change: dict):
+        async with self._lock:
+            if self.snapshot is None:
+                return
+
+            match change.get("operationType"):
+                case "insert" | "update" | "replace" | "delete":
+                    self.snapshot = self.snapshot.with_change(change)
+                case _:
+                    self.snapshot = None
+
+    async def _watch(self):
+        while True:
+            try:
+                async with StreamerConfigRepository.connect() as collection:
+                    cursor = await collection.aggregate(
+                        [{"$changeStream": {"fullDocument": "updateLookup"}}],
+                        max_await_time_ms=config.STREAMERS_CACHE_CHANGE_STREAM_AWAIT_MS,
+                    )
+
+                    # Events before the stream was opened are not replayed
+                    async with self._lock:
+                        self.snapshot = None
+                        self.watching = True
+
+                    async for change in cursor:
+                        await self._apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Streamers change stream unavailable, falling back to TTL", exc_info=e)
+
+            self.watching = False
+
+            await asyncio.sleep(config.STREAMERS_CACHE_CHANGE_STREAM_RETRY_INTERVAL)
+
+    def _ensure_watching(self):
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def get(self) -> StreamersSnapshot:
+        self._ensure_watching()
+
+        if not self._is_fresh():
+            async with self._lock:
+                if not self._is_fresh():
+                    await self._load()
+
+        assert self.snapshot is not None
+
+        return self.snapshot
+
+
+streamers_cache = StreamerConfigCache()
+
+
+# Configs are shared by every caller and kept across snapshots, so they must be treated as read-only.
+# Copy with model_copy(deep=True) before changing one.
 class StreamerConfigRepository(BaseRepository):
     COLLECTION_NAME = "streamers"
 
     @classmethod
     async def get_by_twitch_id(cls, twitch_id: int) -> StreamerConfig:
-        async with cls.connect() as collection:
-            doc = await collection.find_one({"twitch.id": twitch_id})
-            if doc is None:
-                raise ValueError(f"Streamer with twitch id {twitch_id} not found")
+        snapshot = await streamers_cache.get()
+
+        streamer = snapshot.by_twitch_id.get(twitch_id)
+        if streamer is None:
+            raise ValueError(f"Streamer with twitch id {twitch_id} not found")
 
-            return StreamerConfig(**doc)
+        return streamer
 
     @classmethod
     async def find_one(
@@ -21,25 +149,39 @@ class StreamerConfigRepository(BaseRepository):
         integration_discord_guild_id: int | None = None,
         integration_discord_games_list_channel_id: int | None = None,
     ) -> StreamerConfig | None:
-        filters = {}
+        snapshot = await streamers_cache.get()
+
+        if integration_discord_guild_id is not None and integration_discord_games_list_channel_id is not None:
+            return snapshot.by_games_list_channel.get(
+                (integration_discord_guild_id, integration_discord_games_list_channel_id)
+            )
+
+        for streamer in snapshot.streamers.values():
+            discord = streamer.integrations.discord
+
+            if integration_discord_guild_id is not None:
+                if discord is None or discord.guild_id != integration_discord_guild_id:
+                    continue
 
-        if integration_discord_guild_id is not None:
-            filters["integrations.discord.guild_id"] = integration_discord_guild_id
+            if integration_discord_games_list_channel_id is not None:
+                if discord is None or discord.games_list is None:
+                    continue
 
-        if integration_discord_games_list_channel_id is not None:
-            filters[
-                "integrations.discord.games_list.channel_id"
-            ] = integration_discord_games_list_channel_id
+                if discord.games_list.channel_id != integration_discord_games_list_channel_id:
+                    continue
 
-        async with cls.connect() as collection:
-            doc = await collection.find_one(filters)
-            if doc is None:
-                return None
+            return streamer
 
-            return StreamerConfig(**doc)
+        return None
+
+    @classmethod
+    async def find_by_chatbot_chat_id(cls, chat_id: int) -> list[StreamerConfig]:
+        snapshot = await streamers_cache.get()
+
+        return list(snapshot.by_chatbot_chat_id.get(chat_id, []))
 
     @classmethod
     async def all(cls) -> list[StreamerConfig]:
-        async with cls.connect() as collection:
-            cursor = await collection.find()
-            return [StreamerConfig(**doc) async for doc in cursor]
+        snapshot = await streamers_cache.get()
+
+        return list(snapshot.streamers.values())
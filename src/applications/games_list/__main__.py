@@ -2,12 +2,22 @@ from asyncio import run
 
 from applications.games_list.discord import client, logger
 from core.config import config
+from core.http import http_manager
+from core.metrics import start_metrics_server
+from core.migrations import run_migrations
 
 
 async def start_discord_sevice():
     logger.info("Starting Discord service...")
 
-    await client.start(config.DISCORD_BOT_TOKEN)
+    start_metrics_server()
+
+    await run_migrations()
+
+    try:
+        await client.start(config.DISCORD_BOT_TOKEN)
+    finally:
+        await http_manager.close()
 
 
 run(start_discord_sevice())
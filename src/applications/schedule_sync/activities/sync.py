@@ -1,11 +1,12 @@
 from temporalio import activity
 
 from applications.common.repositories.streamers import StreamerConfigRepository
-from applications.schedule_sync.synchronizer import syncronize as syncronize_internal
 
 
 @activity.defn
 async def syncronize(twitch_id: int):
+    from applications.schedule_sync.synchronizer import syncronize as syncronize_internal
+
     try:
         streamer = await StreamerConfigRepository.get_by_twitch_id(twitch_id)
 
@@ -2,10 +2,11 @@ from typing import Self
 from datetime import datetime, timedelta
 import logging
 
-from httpx import AsyncClient
 from pydantic import BaseModel, field_serializer, SerializationInfo
 
 from core.config import config
+from core.http import http_manager, Upstream
+from core.rate_limiter import discord_rate_limiter
 
 from .twitch_events import TwitchEvent
 
@@ -47,10 +48,13 @@ class DiscordEvent(BaseModel):
 
 
 async def get_discord_events(guild_id: int) -> list[DiscordEvent]:
-    async with AsyncClient() as client:
-        response = await client.get(
-            f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events",
-            headers={"Authorization": f"Bot {config.DISCORD_BOT_TOKEN}"}
+    async with http_manager.connect(Upstream.DISCORD) as client:
+        response = await discord_rate_limiter.request(
+            f"GET:/guilds/{guild_id}/scheduled-events",
+            lambda: client.get(
+                f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events",
+                headers={"Authorization": f"Bot {config.DISCORD_BOT_TOKEN}"}
+            )
         )
 
         response.raise_for_status()
@@ -61,10 +65,13 @@ async def get_discord_events(guild_id: int) -> list[DiscordEvent]:
 
 
 async def delete_discord_event(guild_id: int, event_id: str):
-    async with AsyncClient() as client:
-        response = await client.delete(
-            f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events/{event_id}",
-            headers={"Authorization": f"Bot {config.DISCORD_BOT_TOKEN}"}
+    async with http_manager.connect(Upstream.DISCORD) as client:
+        response = await discord_rate_limiter.request(
+            f"DELETE:/guilds/{guild_id}/scheduled-events",
+            lambda: client.delete(
+                f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events/{event_id}",
+                headers={"Authorization": f"Bot {config.DISCORD_BOT_TOKEN}"}
+            )
         )
 
         response.raise_for_status()
@@ -120,14 +127,17 @@ class CreateDiscordEvent(BaseModel):
 
 
 async def create_discord_event(guild_id: int, event: CreateDiscordEvent):
-    async with AsyncClient() as client:
-        response = await client.post(
-            f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events",
-            json=event.model_dump(),
-            headers={
-                "Authorization": f"Bot {config.DISCORD_BOT_TOKEN}",
-                "Content-Type": "application/json"
-            }
+    async with http_manager.connect(Upstream.DISCORD) as client:
+        response = await discord_rate_limiter.request(
+            f"POST:/guilds/{guild_id}/scheduled-events",
+            lambda: client.post(
+                f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events",
+                json=event.model_dump(),
+                headers={
+                    "Authorization": f"Bot {config.DISCORD_BOT_TOKEN}",
+                    "Content-Type": "application/json"
+                }
+            )
         )
 
         if response.status_code == 400:
@@ -153,14 +163,17 @@ class UpdateDiscordEvent(BaseModel):
 
 
 async def edit_discord_event(guild_id: int, event_id: str, event: UpdateDiscordEvent):
-    async with AsyncClient() as client:
-        response = await client.patch(
-            f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events/{event_id}",
-            json=event.model_dump(),
-            headers={
-                "Authorization": f"Bot {config.DISCORD_BOT_TOKEN}",
-                "Content-Type": "application/json"
-            }
+    async with http_manager.connect(Upstream.DISCORD) as client:
+        response = await discord_rate_limiter.request(
+            f"PATCH:/guilds/{guild_id}/scheduled-events",
+            lambda: client.patch(
+                f"https://discord.com/api/v10/guilds/{guild_id}/scheduled-events/{event_id}",
+                json=event.model_dump(),
+                headers={
+                    "Authorization": f"Bot {config.DISCORD_BOT_TOKEN}",
+                    "Content-Type": "application/json"
+                }
+            )
         )
 
         if response.status_code == 400:
@@ -4,9 +4,10 @@ from enum import StrEnum
 
 import icalendar
 
-from httpx import AsyncClient
 from pydantic import BaseModel
 
+from core.http import http_manager, Upstream
+
 
 class Weekday(StrEnum):
     Mon = "MO"
@@ -44,7 +45,7 @@ class TwitchEvent(BaseModel):
 
 
 async def get_twitch_events(twitch_channel_id: str) -> list[TwitchEvent]:
-    async with AsyncClient() as client:
+    async with http_manager.connect(Upstream.TWITCH) as client:
         response = await client.get(
             f"https://api.twitch.tv/helix/schedule/icalendar?broadcaster_id={twitch_channel_id}"
         )
@@ -1,58 +1,112 @@
-from asyncio import run
+from .startup import profiler
 
-from core.temporal import get_client
+import logging
+from asyncio import Task, create_task, gather, run, sleep
 
-from temporalio.client import ScheduleAlreadyRunningError
-from temporalio.worker import Worker, UnsandboxedWorkflowRunner
+with profiler.measure_import("temporalio"):
+    from temporalio.client import Client, Schedule, ScheduleAlreadyRunningError, ScheduleUpdate
+    from temporalio.worker import Worker, UnsandboxedWorkflowRunner
 
-from applications.schedule_sync import activities as schedule_sync_activities
-from applications.schedule_sync.workflows import ScheduleSyncWorkflow
+with profiler.measure_import("core"):
+    from core.http import http_manager
+    from core.metrics import start_metrics_server
+    from core.migrations import run_migrations
+    from core.temporal import get_client, MetricsInterceptor, report_task_queue_backlog
 
-from applications.twitch_webhook import activities as twitch_activities
-from applications.twitch_webhook import workflows as twitch_workflows
+with profiler.measure_import("applications.schedule_sync"):
+    from applications.schedule_sync import activities as schedule_sync_activities
+    from applications.schedule_sync.workflows import ScheduleSyncWorkflow
+
+with profiler.measure_import("applications.twitch_webhook"):
+    from applications.twitch_webhook import activities as twitch_activities
+    from applications.twitch_webhook import workflows as twitch_workflows
+    from applications.twitch_webhook.chat_sender import chat_sender
 
 from .queues import MAIN_QUEUE
 
 
+logger = logging.getLogger(__name__)
+
+
+async def create_schedule(client: Client, id: str, schedule: Schedule):
+    try:
+        await client.create_schedule(id, schedule)
+    except ScheduleAlreadyRunningError:
+        # Keep already registered schedules in sync with the code
+        await client.get_schedule_handle(id).update(lambda _: ScheduleUpdate(schedule=schedule))
+
+
+async def register_schedules(client: Client):
+    await gather(
+        *(
+            create_schedule(client, f"ScheduleSyncWorkflow-{id}", schedule)
+            for id, schedule in ScheduleSyncWorkflow.get_schedules().items()
+        ),
+        *(
+            create_schedule(client, f"StreamsCheckWorkflow-{id}", schedule)
+            for id, schedule in twitch_workflows.StreamsCheckWorkflow.get_schedules().items()
+        ),
+    )
+
+    profiler.mark("schedules_registered")
+
+
+def log_schedules_failure(task: Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Failed to register schedules", exc_info=task.exception())
+
+
 async def main():
-    client = await get_client()
+    profiler.mark("imported")
+    profiler.report_imports()
+
+    start_metrics_server()
 
-    for id, schedule in ScheduleSyncWorkflow.get_schedules().items():
-        try:
-            await client.create_schedule(f"ScheduleSyncWorkflow-{id}", schedule)
-        except ScheduleAlreadyRunningError:
-            pass
+    client, _ = await gather(get_client(), run_migrations())
 
-    for id, schedule in twitch_workflows.StreamsCheckWorkflow.get_schedules().items():
-        try:
-            await client.create_schedule(f"StreamsCheckWorkflow-{id}", schedule)
-        except ScheduleAlreadyRunningError:
-            pass
+    profiler.mark("connected")
 
     worker: Worker = Worker(
         client,
         task_queue=MAIN_QUEUE,
         workflows=[
             ScheduleSyncWorkflow,
+            twitch_workflows.ChatWorkflow,
             twitch_workflows.StreamsCheckWorkflow,
             twitch_workflows.OnChannelUpdateWorkflow,
-            twitch_workflows.OnMessageWorkflow,
             twitch_workflows.OnRewardRedemptionWorkflow,
             twitch_workflows.OnStreamOnlineWorkflow,
         ],
         activities=[
             schedule_sync_activities.syncronize,
             schedule_sync_activities.syncronize_all,
-            twitch_activities.on_message_activity,
+            twitch_activities.on_messages_activity,
             twitch_activities.on_stream_state_change_activity,
             twitch_activities.check_streams_states,
             twitch_activities.on_redemption_reward_add_activity,
             twitch_activities.on_channel_update_activity,
         ],
-        workflow_runner=UnsandboxedWorkflowRunner()
+        workflow_runner=UnsandboxedWorkflowRunner(),
+        interceptors=[MetricsInterceptor()],
     )
 
-    await worker.run()
+    worker_task = create_task(worker.run())
+    schedules_task = create_task(register_schedules(client))
+    schedules_task.add_done_callback(log_schedules_failure)
+    backlog_task = create_task(report_task_queue_backlog(client, MAIN_QUEUE))
+
+    try:
+        while not worker.is_running and not worker_task.done():
+            await sleep(0.01)
+
+        profiler.mark("worker_running")
+
+        await worker_task
+    finally:
+        schedules_task.cancel()
+        backlog_task.cancel()
+        await chat_sender.close()
+        await http_manager.close()
 
 
 run(main())
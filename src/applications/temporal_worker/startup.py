@@ -0,0 +1,39 @@
+import contextlib
+import logging
+import time
+
+from core.metrics import WORKER_STARTUP_SECONDS
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.imports: dict[str, float] = {}
+        self.phases: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def measure_import(self, name: str):
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.imports[name] = time.monotonic() - started_at
+
+    def mark(self, phase: str):
+        elapsed = time.monotonic() - self.started_at
+
+        self.phases[phase] = elapsed
+        WORKER_STARTUP_SECONDS.labels(phase).set(elapsed)
+
+        logger.info(f"Reached {phase} after {elapsed * 1000:.1f}ms")
+
+    def report_imports(self):
+        for name, duration in sorted(self.imports.items(), key=lambda item: item[1], reverse=True):
+            WORKER_STARTUP_SECONDS.labels(f"import:{name}").set(duration)
+            logger.info(f"Imported {name} in {duration * 1000:.1f}ms")
+
+
+profiler = StartupProfiler()
@@ -1,10 +1,21 @@
 from asyncio import run
 
+from core.http import http_manager
+from core.metrics import start_metrics_server
+from core.migrations import run_migrations
+
 from .twitch.webhook import TwitchService
 
 
 async def start_twitch_service() -> None:
-    await TwitchService.start()
+    start_metrics_server()
+
+    await run_migrations()
+
+    try:
+        await TwitchService.start()
+    finally:
+        await http_manager.close()
 
 
 run(start_twitch_service())
@@ -1,11 +1,11 @@
-from .message_proc import on_message_activity
+from .message_proc import on_messages_activity
 from .on_state_change import on_stream_state_change_activity, on_channel_update_activity
 from .redemption_reward import on_redemption_reward_add_activity
 from .state_checker import check_streams_states
 
 
 __all__ = [
-    "on_message_activity",
+    "on_messages_activity",
     "on_stream_state_change_activity",
     "check_streams_states",
     "on_redemption_reward_add_activity",
@@ -1,13 +1,46 @@
+import logging
+
+from redis.exceptions import RedisError
 from temporalio import activity
 
+from core.config import config
+from core.redis import redis_manager
+from applications.twitch_webhook.ai_requests import ai_scheduler
 from applications.twitch_webhook.messages_proc import MessageEvent, MessagesProc
 
 
+logger = logging.getLogger(__name__)
+
+
+async def claim_message(message_id: str) -> bool:
+    try:
+        async with redis_manager.connect() as redis:
+            return bool(await redis.set(
+                f"chat_message_processed:{message_id}",
+                1,
+                nx=True,
+                ex=config.CHAT_MESSAGE_PROCESSED_TTL
+            ))
+    except RedisError as e:
+        logger.error(f"Failed to claim chat message {message_id}", exc_info=e)
+        return True
+
+
 @activity.defn
-async def on_message_activity(
-    event: MessageEvent
+async def on_messages_activity(
+    events: list[MessageEvent]
 ):
-    await MessagesProc.on_message(
-        event.received_as,
-        event
-    )
+    # Batches are retried as a whole, so every message is handled at most once
+    for event in events:
+        if not await claim_message(event.message_id):
+            continue
+
+        try:
+            await MessagesProc.on_message(
+                event.received_as,
+                event
+            )
+        except Exception as e:
+            logger.error(f"Failed to process chat message {event.message_id}", exc_info=e)
+
+    await ai_scheduler.join({event.broadcaster_user_id for event in events})
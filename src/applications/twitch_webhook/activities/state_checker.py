@@ -1,29 +1,128 @@
+import asyncio
+import logging
+import time
 from datetime import datetime, timezone
 
 from temporalio import activity
 
+from core.config import config
 from applications.common.repositories.streamers import StreamerConfigRepository
-from applications.twitch_webhook.twitch.authorize import authorize
+from applications.twitch_webhook.poll_scheduler import get_next_poll_at, poll_scheduler
 from applications.twitch_webhook.state import State, EventType
-from applications.twitch_webhook.watcher import StateWatcher
+
+
+logger = logging.getLogger(__name__)
+
+
+HELIX_MAX_USER_IDS = 100
 
 
 @activity.defn
 async def check_streams_states():
+    from applications.twitch_webhook.twitch.authorize import authorize
+    from applications.twitch_webhook.watcher import StateWatcher
+
     streamers = await StreamerConfigRepository.all()
-    streamers_ids = [str(streamer.twitch.id) for streamer in streamers]
+
+    now = time.time()
+    all_ids = [streamer.twitch.id for streamer in streamers]
+
+    await poll_scheduler.prune(all_ids)
+    due_ids = await poll_scheduler.get_due(all_ids, now)
+    streamers_ids = [str(streamer_id) for streamer_id in due_ids]
+
+    if not streamers_ids:
+        return
 
     twitch = await authorize("kurbezz")
 
-    async for stream in twitch.get_streams(user_id=streamers_ids):
-        state = State(
-            title=stream.title,
-            category=stream.game_name,
-            last_live_at=datetime.now(timezone.utc)
-        )
+    fetch_semaphore = asyncio.Semaphore(config.TWITCH_STREAMS_CHECK_FETCH_CONCURRENCY)
+    process_semaphore = asyncio.Semaphore(config.TWITCH_STREAMS_CHECK_CONCURRENCY)
+
+    processed = 0
+    failed = 0
+
+    async def heartbeat():
+        # Notifications can take longer than the heartbeat timeout, so progress is reported on a timer
+        while True:
+            activity.heartbeat(processed)
+            await asyncio.sleep(config.TWITCH_STREAMS_CHECK_HEARTBEAT_INTERVAL)
+
+    async def fetch(user_ids: list[str]) -> list | None:
+        async with fetch_semaphore:
+            try:
+                return [
+                    stream
+                    async for stream in twitch.get_streams(user_id=user_ids, first=HELIX_MAX_USER_IDS)
+                ]
+            except Exception as e:
+                logger.error(f"Failed to fetch streams of {len(user_ids)} streamers", exc_info=e)
+                return None
 
-        await StateWatcher.on_stream_state_change(
-            int(stream.user_id),
-            EventType.UNKNOWN,
-            state
+    async def process(streamer_id: int, state: State):
+        nonlocal processed, failed
+
+        async with process_semaphore:
+            try:
+                await StateWatcher.on_stream_state_change(
+                    streamer_id,
+                    EventType.UNKNOWN,
+                    state
+                )
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to process state of {streamer_id}", exc_info=e)
+
+        processed += 1
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+
+    try:
+        id_chunks = [streamers_ids[i:i + HELIX_MAX_USER_IDS] for i in range(0, len(streamers_ids), HELIX_MAX_USER_IDS)]
+        chunks = await asyncio.gather(*(fetch(user_ids) for user_ids in id_chunks))
+
+        # Streamers from failed chunks stay due and are polled again on the next run
+        checked_ids = [
+            int(user_id)
+            for user_ids, chunk in zip(id_chunks, chunks)
+            if chunk is not None
+            for user_id in user_ids
+        ]
+
+        states = {
+            int(stream.user_id): State(
+                title=stream.title,
+                category=stream.game_name,
+                last_live_at=datetime.now(timezone.utc)
+            )
+            for chunk in chunks
+            if chunk is not None
+            for stream in chunk
+        }
+
+        offline_ids = [streamer_id for streamer_id in checked_ids if streamer_id not in states]
+
+        # Streamers without a cached schedule wait the idle interval until it is fetched below
+        scheduled_starts = await poll_scheduler.get_cached_scheduled_starts(offline_ids)
+        await poll_scheduler.schedule({
+            streamer_id: get_next_poll_at(now, streamer_id in states, scheduled_starts.get(streamer_id, []))
+            for streamer_id in checked_ids
+        })
+
+        changed = await StateWatcher.refresh_unchanged(states)
+
+        await asyncio.gather(*(process(streamer_id, state) for streamer_id, state in changed.items()))
+
+        fetched_starts = await poll_scheduler.refresh_scheduled_starts(
+            [streamer_id for streamer_id in offline_ids if streamer_id not in scheduled_starts]
         )
+        await poll_scheduler.schedule({
+            streamer_id: get_next_poll_at(time.time(), False, starts)
+            for streamer_id, starts in fetched_starts.items()
+        })
+    finally:
+        heartbeat_task.cancel()
+
+    logger.info(
+        f"Checked {len(checked_ids)}/{len(streamers_ids)} due of {len(streamers)} streamers: {len(states)} live, {len(changed)} changed, {processed - failed} processed, {failed} failed"
+    )
@@ -0,0 +1,110 @@
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Awaitable, Callable
+
+from redis.exceptions import RedisError
+
+from core.config import config
+from core.metrics import AI_REQUESTS_TOTAL
+from core.redis import redis_manager
+
+
+logger = logging.getLogger(__name__)
+
+
+class CompletionCache:
+    def _key(self, messages: list[dict]) -> str:
+        context = [
+            (message["role"], " ".join(message["content"].lower().split()))
+            for message in messages
+        ]
+
+        digest = hashlib.sha256(json.dumps(context, ensure_ascii=False).encode()).hexdigest()
+
+        return f"ai_completion:{digest}"
+
+    async def get(self, messages: list[dict]) -> str | None:
+        try:
+            async with redis_manager.connect() as redis:
+                completion = await redis.get(self._key(messages))
+        except RedisError as e:
+            logger.error("Failed to read completion cache", exc_info=e)
+            return None
+
+        return completion.decode() if completion is not None else None
+
+    async def set(self, messages: list[dict], completion: str):
+        try:
+            async with redis_manager.connect() as redis:
+                await redis.set(self._key(messages), completion, ex=config.AI_COMPLETION_CACHE_TTL)
+        except RedisError as e:
+            logger.error("Failed to update completion cache", exc_info=e)
+
+
+class ChannelAIScheduler:
+    def __init__(self, channel_id: str):
+        self.channel_id = channel_id
+
+        self.semaphore = asyncio.Semaphore(config.AI_CHANNEL_CONCURRENCY)
+        self.queued: dict[str, asyncio.Task] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+    def submit(self, key: str, run: Callable[[], Awaitable[None]]) -> asyncio.Task | None:
+        superseded = self.queued.pop(key, None)
+
+        if superseded is not None:
+            superseded.cancel()
+            AI_REQUESTS_TOTAL.labels("superseded").inc()
+        elif len(self.queued) >= config.AI_CHANNEL_MAX_QUEUED:
+            logger.warning(f"AI request queue is full for {self.channel_id}, dropping request")
+            AI_REQUESTS_TOTAL.labels("dropped").inc()
+            return None
+
+        task = asyncio.create_task(self._run(key, run))
+
+        self.queued[key] = task
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+        return task
+
+    async def _run(self, key: str, run: Callable[[], Awaitable[None]]):
+        await asyncio.sleep(config.AI_COALESCE_WINDOW)
+
+        async with self.semaphore:
+            if self.queued.get(key) is asyncio.current_task():
+                del self.queued[key]
+
+            AI_REQUESTS_TOTAL.labels("started").inc()
+
+            await run()
+
+    async def join(self):
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+class AIScheduler:
+    def __init__(self):
+        self.channels: dict[str, ChannelAIScheduler] = {}
+
+    def get(self, channel_id: str) -> ChannelAIScheduler:
+        channel = self.channels.get(channel_id)
+
+        if channel is None:
+            channel = ChannelAIScheduler(channel_id)
+            self.channels[channel_id] = channel
+
+        return channel
+
+    def submit(self, channel_id: str, key: str, run: Callable[[], Awaitable[None]]) -> asyncio.Task | None:
+        return self.get(channel_id).submit(key, run)
+
+    async def join(self, channel_ids: set[str]):
+        await asyncio.gather(*(self.get(channel_id).join() for channel_id in channel_ids))
+
+
+completion_cache = CompletionCache()
+ai_scheduler = AIScheduler()
@@ -0,0 +1,98 @@
+import json
+import logging
+
+from redis.exceptions import RedisError
+
+from core.config import config
+from core.redis import redis_manager
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_entry_order(entry_id: bytes) -> tuple[int, int]:
+    milliseconds, sequence = entry_id.split(b"-")
+
+    return int(milliseconds), int(sequence)
+
+
+class ChatHistory:
+    def _get_limit(self, channel_id: str) -> int:
+        return config.CHAT_HISTORY_CHANNEL_LIMITS.get(channel_id, config.CHAT_HISTORY_CHANNEL_LIMIT)
+
+    def _stream_key(self, channel_id: str) -> str:
+        return f"chat_history:{channel_id}"
+
+    def _message_key(self, channel_id: str, message_id: str) -> str:
+        return f"chat_history:{channel_id}:message:{message_id}"
+
+    def _thread_key(self, channel_id: str, thread_id: str) -> str:
+        return f"chat_history:{channel_id}:thread:{thread_id}"
+
+    async def append(self, channel_id: str, message: dict, only_if_missing: bool = False):
+        message_key = self._message_key(channel_id, message["id"])
+
+        try:
+            async with redis_manager.connect() as redis:
+                if only_if_missing and await redis.exists(message_key):
+                    return
+
+                entry_id = await redis.xadd(
+                    self._stream_key(channel_id),
+                    {"message": json.dumps(message)},
+                    maxlen=self._get_limit(channel_id),
+                    approximate=True
+                )
+
+                # Message and thread keys only point at stream entries, trimmed entries drop out of lookups
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.set(message_key, entry_id, ex=config.CHAT_HISTORY_TTL)
+
+                    if message["thread_id"] is not None:
+                        thread_key = self._thread_key(channel_id, message["thread_id"])
+
+                        pipe.hset(thread_key, message["id"], entry_id)
+                        pipe.expire(thread_key, config.CHAT_HISTORY_TTL)
+
+                    await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Failed to update chat history for {channel_id}", exc_info=e)
+
+    async def get_with_thread(self, channel_id: str, message_id: str, thread_id: str | None = None) -> list[dict]:
+        stream_key = self._stream_key(channel_id)
+
+        try:
+            async with redis_manager.connect() as redis:
+                async with redis.pipeline(transaction=False) as pipe:
+                    pipe.get(self._message_key(channel_id, thread_id or message_id))
+
+                    if thread_id is not None:
+                        pipe.hvals(self._thread_key(channel_id, thread_id))
+
+                    root, *thread = await pipe.execute()
+
+                entry_ids = [root] if root is not None else []
+
+                if thread:
+                    entry_ids += sorted(thread[0], key=get_entry_order)
+
+                if not entry_ids:
+                    return []
+
+                async with redis.pipeline(transaction=False) as pipe:
+                    for entry_id in entry_ids:
+                        pipe.xrange(stream_key, min=entry_id, max=entry_id)
+
+                    entries = await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Failed to read chat history for {channel_id}", exc_info=e)
+            return []
+
+        return [
+            json.loads(fields[b"message"])
+            for entry in entries
+            for _, fields in entry
+        ]
+
+
+chat_history = ChatHistory()
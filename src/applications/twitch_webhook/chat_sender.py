@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import deque
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from core.config import config
+from core.metrics import TWITCH_CHAT_OUTBOUND_TOTAL
+from core.rate_limiter import twitch_chat_rate_limiter
+
+if TYPE_CHECKING:
+    from twitchAPI.twitch import Twitch
+
+
+logger = logging.getLogger(__name__)
+
+
+class OutgoingMessage(BaseModel):
+    channel_id: str
+    text: str
+    reply_parent_message_id: str | None = None
+
+    def can_merge(self, other: "OutgoingMessage") -> bool:
+        return (
+            self.channel_id == other.channel_id
+            and self.reply_parent_message_id == other.reply_parent_message_id
+            and len(self.text) + 1 + len(other.text) <= config.CHAT_MESSAGE_MAX_LENGTH
+        )
+
+
+class ChannelQueue:
+    def __init__(self, sender_id: str, channel_id: str, twitch: "Twitch"):
+        self.sender_id = sender_id
+        self.channel_id = channel_id
+        self.twitch = twitch
+
+        self.messages: deque[OutgoingMessage] = deque()
+        self.has_messages = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+        self.task: asyncio.Task | None = None
+
+    def put(self, message: OutgoingMessage):
+        self.messages.append(message)
+        self.has_messages.set()
+        self.idle.clear()
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def _take(self) -> OutgoingMessage:
+        message = self.messages.popleft()
+
+        while self.messages and message.can_merge(self.messages[0]):
+            message.text = f"{message.text} {self.messages.popleft().text}"
+            TWITCH_CHAT_OUTBOUND_TOTAL.labels("merged").inc()
+
+        return message
+
+    async def _send(self, message: OutgoingMessage):
+        route = twitch_chat_rate_limiter.get_route(self.sender_id, message.channel_id)
+
+        for attempt in range(config.TWITCH_CHAT_SEND_MAX_RETRIES + 1):
+            await twitch_chat_rate_limiter.wait(route)
+
+            try:
+                response = await self.twitch.send_chat_message(
+                    message.channel_id,
+                    self.sender_id,
+                    message.text,
+                    reply_parent_message_id=message.reply_parent_message_id
+                )
+            except Exception as e:
+                logger.warning(f"Failed to send chat message to {message.channel_id}", exc_info=e)
+            else:
+                if response.is_sent:
+                    TWITCH_CHAT_OUTBOUND_TOTAL.labels("sent").inc()
+                    return
+
+                drop_code = response.drop_reason.code if response.drop_reason is not None else ""
+
+                logger.warning(f"Chat message to {message.channel_id} dropped: {response.drop_reason}")
+
+                if "rate" not in drop_code.lower():
+                    TWITCH_CHAT_OUTBOUND_TOTAL.labels("dropped").inc()
+                    return
+
+            if attempt < config.TWITCH_CHAT_SEND_MAX_RETRIES:
+                await twitch_chat_rate_limiter.block(route, config.TWITCH_CHAT_DROP_BACKOFF * 2 ** attempt)
+
+        TWITCH_CHAT_OUTBOUND_TOTAL.labels("failed").inc()
+
+    async def _run(self):
+        while True:
+            await self.has_messages.wait()
+
+            while self.messages:
+                message = self._take()
+
+                try:
+                    await self._send(message)
+                except Exception as e:
+                    TWITCH_CHAT_OUTBOUND_TOTAL.labels("failed").inc()
+                    logger.error(f"Failed to send chat message to {message.channel_id}", exc_info=e)
+
+            self.has_messages.clear()
+            self.idle.set()
+
+
+class ChatSender:
+    def __init__(self):
+        # One queue per sender and channel, so a burst in one channel never delays the others
+        self.queues: dict[tuple[str, str], ChannelQueue] = {}
+
+    def send(
+        self,
+        twitch: "Twitch",
+        channel_id: str,
+        sender_id: str,
+        text: str,
+        reply_parent_message_id: str | None = None
+    ):
+        queue = self.queues.get((sender_id, channel_id))
+
+        if queue is None:
+            queue = ChannelQueue(sender_id, channel_id, twitch)
+            self.queues[(sender_id, channel_id)] = queue
+        else:
+            queue.twitch = twitch
+
+        queue.put(OutgoingMessage(
+            channel_id=channel_id,
+            text=text,
+            reply_parent_message_id=reply_parent_message_id
+        ))
+
+    async def close(self):
+        queues, self.queues = self.queues, {}
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.idle.wait() for queue in queues.values())),
+                timeout=config.TWITCH_CHAT_CLOSE_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Chat sender closed with undelivered messages")
+
+        for queue in queues.values():
+            if queue.task is not None:
+                queue.task.cancel()
+
+
+chat_sender = ChatSender()
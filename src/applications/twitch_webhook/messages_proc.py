@@ -1,12 +1,22 @@
 from enum import StrEnum
+import json
 import logging
+from string import Template
+from typing import TYPE_CHECKING, AsyncIterator
 
 from pydantic import BaseModel
-from twitchAPI.object.eventsub import ChannelChatMessageEvent
-from httpx import AsyncClient
 
 from core.config import config
-from .twitch.authorize import authorize, Twitch
+from core.http import http_manager, Upstream
+from core.metrics import AI_REQUESTS_TOTAL
+from .ai_requests import ai_scheduler, completion_cache
+from .chat_sender import chat_sender
+from .chat_history import chat_history
+
+if TYPE_CHECKING:
+    from applications.common.domain.streamers import ChatRule
+    from twitchAPI.object.eventsub import ChannelChatMessageEvent
+    from twitchAPI.twitch import Twitch
 
 
 logger = logging.getLogger(__name__)
@@ -59,7 +69,7 @@ class MessageEvent(BaseModel):
     channel_points_custom_reward_id: str | None
 
     @classmethod
-    def from_twitch_event(cls, received_as: str, event: ChannelChatMessageEvent):
+    def from_twitch_event(cls, received_as: str, event: "ChannelChatMessageEvent"):
         return cls(
             received_as=received_as,
 
@@ -96,10 +106,11 @@ class MessageEvent(BaseModel):
 
 
 
-async def get_completion(messages: list[dict]) -> str:
-    logger.info(f"Getting completion for message: {messages}")
+SENTENCE_ENDINGS = (".", "!", "?", "…")
 
-    data_messages = [
+
+def get_completion_messages(messages: list[dict]) -> list[dict]:
+    return [
         {
             "role": "system",
             "content": (
@@ -122,16 +133,24 @@ async def get_completion(messages: list[dict]) -> str:
         ),
     ]
 
-    async with AsyncClient() as client:
+
+def get_completion_headers() -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {config.OPENAI_API_KEY}",
+        "content-type": "application/json"
+    }
+
+
+async def get_completion(messages: list[dict]) -> str:
+    logger.info(f"Getting completion for message: {messages}")
+
+    async with http_manager.connect(Upstream.OPENROUTER) as client:
         response = await client.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {config.OPENAI_API_KEY}",
-                "content-type": "application/json"
-            },
+            config.OPENROUTER_API_URL,
+            headers=get_completion_headers(),
             json={
-                "model": "deepseek/deepseek-chat-v3-0324:free",
-                "messages": data_messages
+                "model": config.OPENROUTER_MODEL,
+                "messages": get_completion_messages(messages)
             }
         )
 
@@ -142,175 +161,268 @@ async def get_completion(messages: list[dict]) -> str:
         return data["choices"][0]["message"]["content"]
 
 
-class MessagesProc:
-    FULL_IGNORED_USER_LOGINS = [
-        "jeetbot",
-    ]
+async def stream_completion(messages: list[dict]) -> AsyncIterator[str]:
+    logger.info(f"Streaming completion for message: {messages}")
 
-    MESSAGE_LIMIT = 1000
-    MESSAGE_HISTORY = []
+    async with http_manager.connect(Upstream.OPENROUTER) as client:
+        async with client.stream(
+            "POST",
+            config.OPENROUTER_API_URL,
+            headers=get_completion_headers(),
+            json={
+                "model": config.OPENROUTER_MODEL,
+                "messages": get_completion_messages(messages),
+                "stream": True
+            }
+        ) as response:
+            response.raise_for_status()
 
-    @classmethod
-    def update_message_history(cls, id: str, text: str, user: str, thread_id: str | None = None):
-        cls.MESSAGE_HISTORY.append({
-            "id": id,
-            "text": text,
-            "user": user,
-            "thread_id": thread_id
-        })
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
 
-        if len(cls.MESSAGE_HISTORY) > cls.MESSAGE_LIMIT:
-            cls.MESSAGE_HISTORY = cls.MESSAGE_HISTORY[-cls.MESSAGE_LIMIT:]
+                data = line.removeprefix("data:").strip()
+                if data == "[DONE]":
+                    break
 
-    @classmethod
-    def get_message_history_with_thread(cls, message_id: str, thread_id: str | None = None) -> list[dict]:
-        logger.info(f"HISTORY: {cls.MESSAGE_HISTORY}")
+                try:
+                    chunk = json.loads(data)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping malformed completion chunk: {data}")
+                    continue
 
-        if thread_id is not None:
-            return (
-                [m for m in cls.MESSAGE_HISTORY if m["id"] == thread_id]
-                + [m for m in cls.MESSAGE_HISTORY if m["thread_id"] == thread_id]
-            )
+                if "error" in chunk:
+                    raise RuntimeError(f"Completion stream failed: {chunk['error']}")
+
+                choices = chunk.get("choices") or [{}]
+                content = choices[0].get("delta", {}).get("content")
+
+                if content:
+                    yield content
+
+
+async def iter_completion(messages: list[dict]) -> AsyncIterator[str]:
+    completion_messages = get_completion_messages(messages)
+
+    cached = await completion_cache.get(completion_messages)
+    if cached is not None:
+        AI_REQUESTS_TOTAL.labels("cached").inc()
+        yield cached
+        return
 
-        return [m for m in cls.MESSAGE_HISTORY if m["id"] == message_id]
+    if config.OPENROUTER_STREAMING:
+        completion = ""
 
+        async for delta in stream_completion(messages):
+            completion += delta
+            yield delta
+    else:
+        completion = await get_completion(messages)
+        yield completion
+
+    await completion_cache.set(completion_messages, completion)
+
+
+def find_sentence_end(text: str, min_length: int) -> int | None:
+    for index in range(len(text) - 2, min_length - 2, -1):
+        if text[index + 1] == "\n" or (text[index] in SENTENCE_ENDINGS and text[index + 1].isspace()):
+            return index + 1
+
+    return None
+
+
+def find_split_position(text: str, max_length: int, min_length: int = 1) -> int | None:
+    window = text[:max_length + 1]
+
+    position = find_sentence_end(window, min_length)
+    if position is not None or len(text) <= max_length:
+        return position
+
+    position = find_sentence_end(window, 1)
+    if position is not None:
+        return position
+
+    index = window.rfind(" ")
+    if index > 0:
+        return index
+
+    return max_length
+
+
+async def split_completion(
+    deltas: AsyncIterator[str],
+    max_length: int,
+    min_length: int = 1
+) -> AsyncIterator[str]:
+    buffer = ""
+
+    async for delta in deltas:
+        buffer += delta
+
+        while (position := find_split_position(buffer, max_length, min_length)) is not None:
+            part, buffer = buffer[:position].strip(), buffer[position:].lstrip()
+
+            if part:
+                yield part
+
+                # Only the first part is cut early, the rest are filled up to max_length
+                min_length = max_length
+
+    buffer = buffer.strip()
+
+    while len(buffer) > max_length:
+        position = find_split_position(buffer, max_length)
+        assert position is not None
+
+        part, buffer = buffer[:position].strip(), buffer[position:].lstrip()
+
+        if part:
+            yield part
+
+    if buffer:
+        yield buffer
+
+
+class MessagesProc:
     @classmethod
-    async def _update_history(cls, event: MessageEvent):
-        cls.update_message_history(
-            id=event.message_id,
-            text=event.message.text,
-            user=event.chatter_user_login,
-            thread_id=event.reply.thread_message_id if event.reply is not None else None
+    async def update_message_history(
+        cls,
+        channel_id: str,
+        id: str,
+        text: str,
+        user: str,
+        thread_id: str | None = None,
+        only_if_missing: bool = False
+    ):
+        await chat_history.append(
+            channel_id,
+            {
+                "id": id,
+                "text": text,
+                "user": user,
+                "thread_id": thread_id
+            },
+            only_if_missing=only_if_missing
         )
 
     @classmethod
-    async def _goida(cls, twitch: Twitch, event: MessageEvent):
-        if "гойда" in event.message.text.lower():
-            await twitch.send_chat_message(
-                event.broadcaster_user_id,
-                config.TWITCH_ADMIN_USER_ID,
-                "ГООООООООООООООООООООООООООООООООООООООООООООООЙДА!",
-                reply_parent_message_id=event.message_id
-            )
+    async def get_message_history_with_thread(
+        cls,
+        channel_id: str,
+        message_id: str,
+        thread_id: str | None = None
+    ) -> list[dict]:
+        return await chat_history.get_with_thread(channel_id, message_id, thread_id)
 
     @classmethod
-    async def _lasqexx(cls, twitch: Twitch, event: MessageEvent):
-        if "lasqexx" not in event.chatter_user_login:
-            return
-
-        if "здароу" in event.message.text.lower():
-            await twitch.send_chat_message(
-                event.broadcaster_user_id,
-                config.TWITCH_ADMIN_USER_ID,
-                "Здароу, давай иди уже",
-                reply_parent_message_id=event.message_id
-            )
-            return
-
-        if "сосал?" in event.message.text.lower():
-            await twitch.send_chat_message(
-                event.broadcaster_user_id,
-                config.TWITCH_ADMIN_USER_ID,
-                "А ты? Иди уже",
-                reply_parent_message_id=event.message_id
+    async def _update_history(cls, event: MessageEvent):
+        if event.reply is not None:
+            is_thread_root = event.reply.parent_message_id == event.reply.thread_message_id
+
+            await cls.update_message_history(
+                channel_id=event.broadcaster_user_id,
+                id=event.reply.parent_message_id,
+                text=event.reply.parent_message_body,
+                user=event.reply.parent_user_login,
+                thread_id=None if is_thread_root else event.reply.thread_message_id,
+                only_if_missing=True
             )
-            return
 
-        if "лан я пошёл" in event.message.text.lower():
-            await twitch.send_chat_message(
-                event.broadcaster_user_id,
-                config.TWITCH_ADMIN_USER_ID,
-                "да да, иди уже",
-                reply_parent_message_id=event.message_id
-            )
+        await cls.update_message_history(
+            channel_id=event.broadcaster_user_id,
+            id=event.message_id,
+            text=event.message.text,
+            user=event.chatter_user_login,
+            thread_id=event.reply.thread_message_id if event.reply is not None else None
+        )
 
     @classmethod
-    async def _ask_ai(cls, twitch: Twitch, event: MessageEvent):
-        if not event.message.text.lower().startswith("!ai"):
-            return
+    def _reply_with_completion(cls, twitch: "Twitch", event: MessageEvent, error_text: str, key: str):
+        ai_scheduler.submit(
+            event.broadcaster_user_id,
+            key,
+            lambda: cls._send_completion(twitch, event, error_text)
+        )
 
+    @classmethod
+    async def _send_completion(cls, twitch: "Twitch", event: MessageEvent, error_text: str):
         try:
-            messages = cls.get_message_history_with_thread(
+            messages = await cls.get_message_history_with_thread(
+                event.broadcaster_user_id,
                 event.message_id,
                 thread_id=event.reply.thread_message_id if event.reply is not None else None
             )
-            completion = await get_completion(messages)
 
-            max_length = 255
-            completion_parts = [completion[i:i + max_length] for i in range(0, len(completion), max_length)]
+            parts = split_completion(
+                iter_completion(messages),
+                config.CHAT_MESSAGE_MAX_LENGTH,
+                config.CHAT_MESSAGE_MIN_LENGTH
+            )
 
-            for part in completion_parts:
-                await twitch.send_chat_message(
+            index = 0
+            async for part in parts:
+                chat_sender.send(
+                    twitch,
                     event.broadcaster_user_id,
                     config.TWITCH_ADMIN_USER_ID,
                     part,
                     reply_parent_message_id=event.message_id
                 )
 
-                cls.update_message_history(
-                    id="ai",
+                await cls.update_message_history(
+                    channel_id=event.broadcaster_user_id,
+                    id=f"ai:{event.message_id}:{index}",
                     text=part,
                     user="kurbezz",
                     thread_id=event.message_id
                 )
+
+                index += 1
         except Exception as e:
             logger.error(f"Failed to get completion: {e}", exc_info=True)
 
-            await twitch.send_chat_message(
+            chat_sender.send(
+                twitch,
                 event.broadcaster_user_id,
                 config.TWITCH_ADMIN_USER_ID,
-                "Ошибка!",
+                error_text,
                 reply_parent_message_id=event.message_id
             )
 
     @classmethod
-    async def _kurbezz(cls, twitch: Twitch, event: MessageEvent):
-        if event.chatter_user_login.lower() in ["kurbezz", "hafmc"]:
+    async def _apply_rule(cls, twitch: "Twitch", event: MessageEvent, rule: "ChatRule"):
+        if rule.ai:
+            if event.reply is not None:
+                key = event.reply.thread_message_id
+            else:
+                key = rule.name if rule.ai_coalesce else event.message_id
+
+            cls._reply_with_completion(twitch, event, rule.response or "Ошибка!", key=key)
             return
 
-        if ("kurbezz" in event.message.text.lower() or \
-            "курбез" in event.message.text.lower() or \
-            "булат" in event.message.text.lower()):
+        if rule.response is None:
+            return
 
-            try:
-                messages = cls.get_message_history_with_thread(
-                    event.message_id,
-                    thread_id=event.reply.thread_message_id if event.reply is not None else None
-                )
-                completion = await get_completion(messages)
-
-                max_length = 255
-                completion_parts = [completion[i:i + max_length] for i in range(0, len(completion), max_length)]
-
-                for part in completion_parts:
-                    await twitch.send_chat_message(
-                        event.broadcaster_user_id,
-                        config.TWITCH_ADMIN_USER_ID,
-                        part,
-                        reply_parent_message_id=event.message_id
-                    )
-
-                    cls.update_message_history(
-                        id="ai",
-                        text=part,
-                        user="kurbezz",
-                        thread_id=event.message_id
-                    )
-            except Exception as e:
-                logger.error(f"Failed to get completion: {e}")
-
-                await twitch.send_chat_message(
-                    event.broadcaster_user_id,
-                    config.TWITCH_ADMIN_USER_ID,
-                    "Пошел нахуй!",
-                    reply_parent_message_id=event.message_id
-                )
+        chat_sender.send(
+            twitch,
+            event.broadcaster_user_id,
+            config.TWITCH_ADMIN_USER_ID,
+            Template(rule.response).safe_substitute(
+                user=event.chatter_user_name,
+                channel=event.broadcaster_user_name,
+                text=event.message.text
+            ),
+            reply_parent_message_id=event.message_id
+        )
 
     @classmethod
     async def on_message(cls, received_as: str, event: MessageEvent):
         return
 
-        if event.chatter_user_name in cls.FULL_IGNORED_USER_LOGINS:
+        from .triggers import IGNORED_CHATTER_LOGINS, chat_rules
+        from .twitch.authorize import authorize
+
+        if event.chatter_user_name in IGNORED_CHATTER_LOGINS:
             return
 
         logging.info(f"Received message: {event}")
@@ -319,7 +431,5 @@ class MessagesProc:
 
         twitch = await authorize(received_as)
 
-        await cls._goida(twitch, event)
-        await cls._lasqexx(twitch, event)
-        await cls._ask_ai(twitch, event)
-        await cls._kurbezz(twitch, event)
+        for rule in await chat_rules.match(event):
+            await cls._apply_rule(twitch, event, rule)
@@ -1,8 +1,9 @@
 import logging
 
-from httpx import AsyncClient
-
 from core.config import config
+from core.http import http_manager, Upstream
+from core.rate_limiter import discord_rate_limiter, telegram_rate_limiter
+from core.tracing import span
 from applications.common.domain.streamers import StreamerConfig
 
 from .state import State
@@ -13,15 +14,19 @@ logger = logging.getLogger(__name__)
 
 
 async def notify_telegram(msg: str, chat_id: str) -> SentResult:
-    async with AsyncClient() as client:
+    async with http_manager.connect(Upstream.TELEGRAM) as client:
         try:
-            result = await client.post(
-                f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": msg,
-                }
-            )
+            with span("telegram.send_message", chat_id=chat_id):
+                result = await telegram_rate_limiter.request(
+                    chat_id,
+                    lambda: client.post(
+                        f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/sendMessage",
+                        json={
+                            "chat_id": chat_id,
+                            "text": msg,
+                        }
+                    )
+                )
 
             result.raise_for_status()
         except Exception as e:
@@ -35,15 +40,19 @@ async def notify_telegram(msg: str, chat_id: str) -> SentResult:
 
 
 async def delete_telegram_message(chat_id: int, message_id: int):
-    async with AsyncClient() as client:
+    async with http_manager.connect(Upstream.TELEGRAM) as client:
         try:
-            result = await client.post(
-                f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/deleteMessage",
-                json={
-                    "chat_id": chat_id,
-                    "message_id": message_id
-                }
-            )
+            with span("telegram.delete_message", chat_id=chat_id):
+                result = await telegram_rate_limiter.request(
+                    str(chat_id),
+                    lambda: client.post(
+                        f"https://api.telegram.org/bot{config.TELEGRAM_BOT_TOKEN}/deleteMessage",
+                        json={
+                            "chat_id": chat_id,
+                            "message_id": message_id
+                        }
+                    )
+                )
 
             result.raise_for_status()
         except Exception as e:
@@ -54,17 +63,21 @@ async def delete_telegram_message(chat_id: int, message_id: int):
 
 
 async def notify_discord(msg: str, channel_id: str) -> SentResult:
-    async with AsyncClient() as client:
+    async with http_manager.connect(Upstream.DISCORD) as client:
         try:
-            result = await client.post(
-            f"https://discord.com/api/v10/channels/{channel_id}/messages",
-                headers={
-                    "Authorization": f"Bot {config.DISCORD_BOT_TOKEN}"
-                },
-                json={
-                    "content": msg,
-                }
-            )
+            with span("discord.send_message", channel_id=channel_id):
+                result = await discord_rate_limiter.request(
+                    f"POST:/channels/{channel_id}/messages",
+                    lambda: client.post(
+                        f"https://discord.com/api/v10/channels/{channel_id}/messages",
+                        headers={
+                            "Authorization": f"Bot {config.DISCORD_BOT_TOKEN}"
+                        },
+                        json={
+                            "content": msg,
+                        }
+                    )
+                )
 
             result.raise_for_status()
         except Exception as e:
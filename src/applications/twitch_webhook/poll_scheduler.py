@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+from redis.exceptions import RedisError
+
+from core.config import config
+from core.redis import redis_manager
+
+
+logger = logging.getLogger(__name__)
+
+
+WEEK = timedelta(weeks=1)
+
+
+def get_scheduled_starts(events: list, now: datetime, horizon: timedelta) -> list[float]:
+    window_start = now - timedelta(seconds=config.TWITCH_POLL_SCHEDULE_WINDOW_AFTER)
+    window_end = now + horizon
+
+    starts: list[float] = []
+
+    for event in events:
+        start_at = event.start_at
+
+        if not isinstance(start_at, datetime):
+            continue
+
+        if start_at.tzinfo is None:
+            start_at = start_at.replace(tzinfo=timezone.utc)
+
+        if event.repeat_rule is None:
+            if window_start <= start_at <= window_end:
+                starts.append(start_at.timestamp())
+            continue
+
+        if start_at < window_start:
+            start_at += WEEK * math.ceil((window_start - start_at) / WEEK)
+
+        while start_at <= window_end:
+            starts.append(start_at.timestamp())
+            start_at += WEEK
+
+    return sorted(starts)
+
+
+def get_next_poll_at(now: float, is_live: bool, starts: list[float]) -> float:
+    if is_live:
+        return now + config.TWITCH_POLL_LIVE_INTERVAL
+
+    before = config.TWITCH_POLL_SCHEDULE_WINDOW_BEFORE
+    after = config.TWITCH_POLL_SCHEDULE_WINDOW_AFTER
+
+    if any(start - before <= now <= start + after for start in starts):
+        return now + config.TWITCH_POLL_SCHEDULED_INTERVAL
+
+    upcoming = [start - before for start in starts if start - before > now]
+
+    return min([now + config.TWITCH_POLL_IDLE_INTERVAL, *upcoming])
+
+
+class PollScheduler:
+    NEXT_POLL_KEY = "stream_poll:next"
+
+    def _schedule_key(self, streamer_id: int) -> str:
+        return f"stream_schedule:{streamer_id}"
+
+    async def get_due(self, streamer_ids: list[int], now: float) -> list[int]:
+        if not streamer_ids:
+            return []
+
+        try:
+            async with redis_manager.connect() as redis:
+                scores = await redis.zmscore(self.NEXT_POLL_KEY, streamer_ids)
+        except RedisError as e:
+            logger.error("Poll schedule is unavailable, polling every streamer", exc_info=e)
+            return streamer_ids
+
+        return [
+            streamer_id
+            for streamer_id, score in zip(streamer_ids, scores)
+            if score is None or score <= now
+        ]
+
+    async def prune(self, streamer_ids: list[int]):
+        known = {str(streamer_id).encode() for streamer_id in streamer_ids}
+
+        try:
+            async with redis_manager.connect() as redis:
+                scheduled = await redis.zrange(self.NEXT_POLL_KEY, 0, -1)
+
+                removed = [member for member in scheduled if member not in known]
+                if removed:
+                    await redis.zrem(self.NEXT_POLL_KEY, *removed)
+        except RedisError as e:
+            logger.error("Failed to prune poll schedule", exc_info=e)
+
+    async def schedule(self, next_polls: dict[int, float]):
+        if not next_polls:
+            return
+
+        try:
+            async with redis_manager.connect() as redis:
+                await redis.zadd(self.NEXT_POLL_KEY, next_polls)
+        except RedisError as e:
+            logger.error("Failed to update poll schedule", exc_info=e)
+
+    async def _fetch_scheduled_starts(self, streamer_id: int) -> list[float] | None:
+        from applications.schedule_sync.twitch_events import get_twitch_events
+
+        try:
+            events = await get_twitch_events(str(streamer_id))
+        except Exception as e:
+            logger.warning(f"Failed to fetch schedule for {streamer_id}", exc_info=e)
+            return None
+
+        return get_scheduled_starts(
+            events,
+            datetime.now(timezone.utc),
+            timedelta(seconds=config.TWITCH_SCHEDULE_CACHE_TTL) + WEEK
+        )
+
+    async def get_cached_scheduled_starts(self, streamer_ids: list[int]) -> dict[int, list[float]]:
+        if not streamer_ids:
+            return {}
+
+        try:
+            async with redis_manager.connect() as redis:
+                cached = await redis.mget([self._schedule_key(streamer_id) for streamer_id in streamer_ids])
+        except RedisError as e:
+            logger.error("Failed to read cached schedules", exc_info=e)
+            return {}
+
+        return {
+            streamer_id: json.loads(value)
+            for streamer_id, value in zip(streamer_ids, cached)
+            if value is not None
+        }
+
+    async def _cache_scheduled_starts(self, streamer_id: int, starts: list[float]):
+        try:
+            async with redis_manager.connect() as redis:
+                await redis.set(
+                    self._schedule_key(streamer_id),
+                    json.dumps(starts),
+                    ex=config.TWITCH_SCHEDULE_CACHE_TTL
+                )
+        except RedisError as e:
+            logger.error(f"Failed to cache schedule for {streamer_id}", exc_info=e)
+
+    async def refresh_scheduled_starts(self, streamer_ids: list[int]) -> dict[int, list[float]]:
+        semaphore = asyncio.Semaphore(config.TWITCH_STREAMS_CHECK_FETCH_CONCURRENCY)
+
+        async def fetch(streamer_id: int) -> list[float] | None:
+            async with semaphore:
+                streamer_starts = await self._fetch_scheduled_starts(streamer_id)
+
+                # Cached as it arrives, so a cold cache still fills up across runs cut off by the timeout
+                if streamer_starts is not None:
+                    await self._cache_scheduled_starts(streamer_id, streamer_starts)
+
+                return streamer_starts
+
+        fetched = await asyncio.gather(*(fetch(streamer_id) for streamer_id in streamer_ids))
+
+        return {
+            streamer_id: streamer_starts
+            for streamer_id, streamer_starts in zip(streamer_ids, fetched)
+            if streamer_starts is not None
+        }
+
+    async def get_scheduled_starts(self, streamer_ids: list[int]) -> dict[int, list[float]]:
+        starts = await self.get_cached_scheduled_starts(streamer_ids)
+
+        starts.update(await self.refresh_scheduled_starts(
+            [streamer_id for streamer_id in streamer_ids if streamer_id not in starts]
+        ))
+
+        return starts
+
+    async def on_online(self, streamer_id: int):
+        await self.schedule({streamer_id: time.time() + config.TWITCH_POLL_LIVE_INTERVAL})
+
+    async def on_offline(self, streamer_id: int):
+        starts = await self.get_scheduled_starts([streamer_id])
+
+        await self.schedule({streamer_id: get_next_poll_at(time.time(), False, starts.get(streamer_id, []))})
+
+
+poll_scheduler = PollScheduler()
@@ -1,11 +1,13 @@
 import logging
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
 
-from twitchAPI.object.eventsub import ChannelPointsCustomRewardRedemptionAddEvent
-
 from applications.common.repositories.streamers import StreamerConfigRepository
-from .twitch.authorize import authorize
+from applications.twitch_webhook.chat_sender import chat_sender
+
+if TYPE_CHECKING:
+    from twitchAPI.object.eventsub import ChannelPointsCustomRewardRedemptionAddEvent
 
 
 logger = logging.getLogger(__name__)
@@ -19,7 +21,7 @@ class RewardRedemption(BaseModel):
     user_input: str
 
     @classmethod
-    def from_twitch_event(cls, event: ChannelPointsCustomRewardRedemptionAddEvent):
+    def from_twitch_event(cls, event: "ChannelPointsCustomRewardRedemptionAddEvent"):
         return cls(
             broadcaster_user_id=event.event.broadcaster_user_id,
             broadcaster_user_login=event.event.broadcaster_user_login,
@@ -32,6 +34,8 @@ class RewardRedemption(BaseModel):
 async def on_redemption_reward_add(reward: RewardRedemption):
     logger.info(f"{reward.user_name} just redeemed {reward.reward_title}!")
 
+    from .twitch.authorize import authorize
+
     twitch = await authorize(reward.broadcaster_user_login)
 
     streamer = await StreamerConfigRepository.get_by_twitch_id(int(reward.broadcaster_user_id))
@@ -45,7 +49,8 @@ async def on_redemption_reward_add(reward: RewardRedemption):
         reward_promt=f" ({reward.user_input})" if reward.user_input else ""
     )
 
-    await twitch.send_chat_message(
+    chat_sender.send(
+        twitch,
         reward.broadcaster_user_id,
         reward.broadcaster_user_id,
         message
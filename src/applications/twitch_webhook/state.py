@@ -1,8 +1,12 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from enum import StrEnum
+from typing import Callable
+from uuid import uuid4
 
+from mongojet import DuplicateKeyError
 from pydantic import BaseModel
 
+from core.config import config
 from core.mongo import mongo_manager
 
 
@@ -19,6 +23,21 @@ class State(BaseModel):
         return self.title == value.title and self.category == value.category
 
 
+class PendingNotification(BaseModel):
+    id: str
+    notification_type: str
+    state: State
+    claimed_until: datetime | None = None
+
+    def is_claimed(self, now: datetime) -> bool:
+        return self.claimed_until is not None and self.claimed_until > now
+
+
+class StoredState(State):
+    version: int | None = None
+    pending_notification: PendingNotification | None = None
+
+
 class UpdateEvent(BaseModel):
     broadcaster_user_id: str
     broadcaster_user_login: str
@@ -36,25 +55,93 @@ class StateManager:
     COLLECTION_NAME = "stream_twitch_state"
 
     @classmethod
-    async def get(cls, twitch_id: int) -> State | None:
+    async def get_many(cls, twitch_ids: list[int]) -> dict[int, StoredState]:
+        async with mongo_manager.connect() as client:
+            db = client.get_default_database()
+            collection = db[cls.COLLECTION_NAME]
+
+            cursor = await collection.find({"twitch_id": {"$in": twitch_ids}})
+
+            return {doc["twitch_id"]: StoredState(**doc) async for doc in cursor}
+
+    @classmethod
+    async def refresh_many(cls, twitch_ids: list[int], last_live_at: datetime):
+        if not twitch_ids:
+            return
+
+        async with mongo_manager.connect() as client:
+            db = client.get_default_database()
+            collection = db[cls.COLLECTION_NAME]
+
+            await collection.update_many(
+                {"twitch_id": {"$in": twitch_ids}},
+                {"$set": {"last_live_at": last_live_at}}
+            )
+
+    @classmethod
+    async def transition(
+        cls,
+        twitch_id: int,
+        state: State,
+        get_notification_type: Callable[[StoredState | None], str | None]
+    ) -> PendingNotification | None:
         async with mongo_manager.connect() as client:
             db = client.get_default_database()
             collection = db[cls.COLLECTION_NAME]
 
-            state = await collection.find_one({"twitch_id": twitch_id})
-            if state is None:
-                return None
+            while True:
+                stored = await collection.find_one({"twitch_id": twitch_id})
+                last_state = StoredState(**stored) if stored is not None else None
+                now = datetime.now(timezone.utc)
+
+                pending = last_state.pending_notification if last_state is not None else None
+                notification_type = get_notification_type(last_state)
+
+                if notification_type is not None:
+                    pending = PendingNotification(id=uuid4().hex, notification_type=notification_type, state=state)
+                elif pending is not None and pending.is_claimed(now):
+                    pending = None
+
+                update: dict = {**state.model_dump()}
+                if pending is not None:
+                    pending.claimed_until = now + timedelta(seconds=config.STREAM_NOTIFICATION_CLAIM_TIMEOUT)
+                    update["pending_notification"] = pending.model_dump()
+
+                # The decision and the claim are written only if nobody changed the state since it was read
+                if last_state is None:
+                    try:
+                        await collection.insert_one({"twitch_id": twitch_id, **update, "version": 1})
+                    except DuplicateKeyError:
+                        continue
+
+                    return pending
+
+                updated = await collection.find_one_and_update(
+                    {"twitch_id": twitch_id, "version": last_state.version},
+                    {"$set": update, "$inc": {"version": 1}}
+                )
 
-            return State(**state)
+                if updated is not None:
+                    return pending
+
+    @classmethod
+    async def complete_notification(cls, twitch_id: int, notification_id: str):
+        async with mongo_manager.connect() as client:
+            db = client.get_default_database()
+            collection = db[cls.COLLECTION_NAME]
+
+            await collection.update_one(
+                {"twitch_id": twitch_id, "pending_notification.id": notification_id},
+                {"$unset": {"pending_notification": ""}}
+            )
 
     @classmethod
-    async def update(cls, twitch_id: int, state: State):
+    async def release_notification(cls, twitch_id: int, notification_id: str):
         async with mongo_manager.connect() as client:
             db = client.get_default_database()
             collection = db[cls.COLLECTION_NAME]
 
             await collection.update_one(
-                {"twitch_id": twitch_id},
-                {"$set": state.model_dump()},
-                upsert=True
+                {"twitch_id": twitch_id, "pending_notification.id": notification_id},
+                {"$set": {"pending_notification.claimed_until": None}}
             )
@@ -0,0 +1,299 @@
+import logging
+import re
+from collections import deque
+from typing import TYPE_CHECKING, Iterable
+
+from applications.common.domain.streamers import ChatRule
+from applications.common.repositories.streamers import streamers_cache
+
+if TYPE_CHECKING:
+    from applications.twitch_webhook.messages_proc import MessageEvent
+
+
+logger = logging.getLogger(__name__)
+
+
+class AhoCorasick:
+    def __init__(self, keywords: Iterable[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[set[str]] = [set()]
+
+        for keyword in keywords:
+            self._add(keyword)
+
+        self._build()
+
+    def _add(self, keyword: str):
+        state = 0
+
+        for char in keyword:
+            next_state = self.goto[state].get(char)
+
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+
+            state = next_state
+
+        self.output[state].add(keyword)
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def find(self, text: str) -> set[str]:
+        found: set[str] = set()
+        state = 0
+
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+
+            state = self.goto[state].get(char, 0)
+
+            if self.output[state]:
+                found |= self.output[state]
+
+        return found
+
+    def find_prefixes(self, text: str) -> set[str]:
+        found: set[str] = set()
+        state = 0
+
+        for depth, char in enumerate(text, start=1):
+            state = self.goto[state].get(char)
+            if state is None:
+                break
+
+            found |= {keyword for keyword in self.output[state] if len(keyword) == depth}
+
+        return found
+
+
+IGNORED_CHATTER_LOGINS = [
+    "jeetbot",
+]
+
+
+DEFAULT_CHAT_RULES = [
+    ChatRule(
+        name="goida",
+        keywords=["гойда"],
+        response="ГООООООООООООООООООООООООООООООООООООООООООООООЙДА!",
+    ),
+    ChatRule(
+        name="lasqexx_hello",
+        group="lasqexx",
+        keywords=["здароу"],
+        chatter_login_contains="lasqexx",
+        response="Здароу, давай иди уже",
+    ),
+    ChatRule(
+        name="lasqexx_question",
+        group="lasqexx",
+        keywords=["сосал?"],
+        chatter_login_contains="lasqexx",
+        response="А ты? Иди уже",
+    ),
+    ChatRule(
+        name="lasqexx_bye",
+        group="lasqexx",
+        keywords=["лан я пошёл"],
+        chatter_login_contains="lasqexx",
+        response="да да, иди уже",
+    ),
+    ChatRule(
+        name="ask_ai",
+        prefix="!ai",
+        response="Ошибка!",
+        ai=True,
+    ),
+    ChatRule(
+        name="kurbezz",
+        keywords=["kurbezz", "курбез", "булат"],
+        excluded_chatter_logins=["kurbezz", "hafmc"],
+        response="Пошел нахуй!",
+        ai=True,
+        ai_coalesce=True,
+    ),
+]
+
+
+BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+
+
+def get_regex_fragment(regex: str) -> str:
+    return f"(?:{regex})"
+
+
+def is_mergeable_regex(compiled: re.Pattern) -> bool:
+    # Group names, backreferences and global flags break once the pattern is merged into one expression
+    if compiled.groupindex or BACKREFERENCE.search(compiled.pattern):
+        return False
+
+    try:
+        re.compile(get_regex_fragment(compiled.pattern))
+    except re.error:
+        return False
+
+    return True
+
+
+class ChatRulesPlan:
+    def __init__(self, rules: list[ChatRule]):
+        self.rules: list[ChatRule] = []
+
+        self.keyword_rules: dict[str, list[int]] = {}
+        self.prefix_rules: dict[str, list[int]] = {}
+        self.regex_rules: list[tuple[int, re.Pattern]] = []
+
+        for rule in rules:
+            compiled = None
+
+            if rule.regex is not None:
+                try:
+                    compiled = re.compile(rule.regex, re.IGNORECASE)
+                except re.error as e:
+                    logger.warning(f"Skipping chat rule {rule.name}: invalid regex", exc_info=e)
+                    continue
+
+            index = len(self.rules)
+            self.rules.append(rule)
+
+            for keyword in rule.keywords:
+                self.keyword_rules.setdefault(keyword.lower(), []).append(index)
+
+            if rule.prefix is not None:
+                self.prefix_rules.setdefault(rule.prefix.lower(), []).append(index)
+
+            if compiled is not None:
+                self.regex_rules.append((index, compiled))
+
+        self.keywords = AhoCorasick(self.keyword_rules.keys())
+        self.prefixes = AhoCorasick(self.prefix_rules.keys())
+
+        self.regex = self._merge_regex_rules()
+
+        self.chatter_contains = [
+            rule.chatter_login_contains.lower() if rule.chatter_login_contains is not None else None
+            for rule in self.rules
+        ]
+        self.excluded_chatters = [
+            {login.lower() for login in rule.excluded_chatter_logins}
+            for rule in self.rules
+        ]
+
+    def _merge_regex_rules(self) -> re.Pattern | None:
+        if not self.regex_rules:
+            return None
+
+        if not all(is_mergeable_regex(compiled) for _, compiled in self.regex_rules):
+            return None
+
+        # One alternation rejects messages matching no pattern in a single scan, most chat matches none
+        try:
+            return re.compile(
+                "|".join(get_regex_fragment(compiled.pattern) for _, compiled in self.regex_rules),
+                re.IGNORECASE
+            )
+        except re.error as e:
+            logger.warning("Failed to merge chat rule patterns, matching them one by one", exc_info=e)
+            return None
+
+    def _accepts_chatter(self, index: int, chatter_login: str) -> bool:
+        if chatter_login in self.excluded_chatters[index]:
+            return False
+
+        contains = self.chatter_contains[index]
+
+        return contains is None or contains in chatter_login
+
+    def match(self, text: str, chatter_login: str) -> list[ChatRule]:
+        text = text.lower()
+        chatter_login = chatter_login.lower()
+
+        candidates: set[int] = set()
+
+        for prefix in self.prefixes.find_prefixes(text):
+            candidates.update(self.prefix_rules[prefix])
+
+        for keyword in self.keywords.find(text):
+            candidates.update(self.keyword_rules[keyword])
+
+        if self.regex_rules and (self.regex is None or self.regex.search(text)):
+            candidates.update(index for index, compiled in self.regex_rules if compiled.search(text))
+
+        matched: list[ChatRule] = []
+        groups: set[str] = set()
+
+        for index in sorted(candidates):
+            rule = self.rules[index]
+
+            if not self._accepts_chatter(index, chatter_login) or rule.group in groups:
+                continue
+
+            if rule.group is not None:
+                groups.add(rule.group)
+
+            matched.append(rule)
+
+        return matched
+
+
+class ChatRulesRegistry:
+    def __init__(self, ignored_chatters: list[str]):
+        self.ignored_chatters = set(ignored_chatters)
+
+        self.default_plan = ChatRulesPlan(DEFAULT_CHAT_RULES)
+        self.plans: dict[int, tuple[list[ChatRule], ChatRulesPlan]] = {}
+
+    async def get_plan(self, broadcaster_user_id: str) -> ChatRulesPlan:
+        snapshot = await streamers_cache.get()
+
+        streamer = snapshot.by_twitch_id.get(int(broadcaster_user_id))
+        if streamer is None or streamer.chat_rules is None:
+            return self.default_plan
+
+        # Snapshots keep unchanged streamer configs, so a new rules list means the streamer was updated
+        cached = self.plans.get(streamer.twitch.id)
+        if cached is not None and cached[0] is streamer.chat_rules:
+            return cached[1]
+
+        plan = ChatRulesPlan(streamer.chat_rules)
+        self.plans[streamer.twitch.id] = (streamer.chat_rules, plan)
+
+        return plan
+
+    async def match(self, event: "MessageEvent") -> list[ChatRule]:
+        if event.chatter_user_name in self.ignored_chatters:
+            return []
+
+        plan = await self.get_plan(event.broadcaster_user_id)
+
+        return plan.match(event.message.text, event.chatter_user_login)
+
+    async def should_dispatch(self, event: "MessageEvent") -> bool:
+        if event.chatter_user_name in self.ignored_chatters:
+            return False
+
+        return event.reply is not None or bool(await self.match(event))
+
+
+chat_rules = ChatRulesRegistry(IGNORED_CHATTER_LOGINS)
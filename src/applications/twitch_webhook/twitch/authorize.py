@@ -1,5 +1,9 @@
+import asyncio
+import time
+
 from twitchAPI.twitch import Twitch
 from twitchAPI.type import AuthScope
+from twitchAPI.oauth import validate_token
 
 from core.config import config
 
@@ -19,22 +23,101 @@ SCOPES = [
 ]
 
 
-async def authorize(user: str, auto_refresh_auth: bool = False) -> Twitch:
-    twitch = Twitch(
-        config.TWITCH_CLIENT_ID,
-        config.TWITCH_CLIENT_SECRET
-    )
+class CachedTwitch:
+    def __init__(self, twitch: Twitch, expires_at: float):
+        self.twitch = twitch
+        self.expires_at = expires_at
+        self.last_used_at = time.monotonic()
+
+    def is_expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def is_idle(self) -> bool:
+        return time.monotonic() - self.last_used_at >= config.TWITCH_CLIENT_CACHE_IDLE_TTL
+
+
+class TwitchClientCache:
+    def __init__(self):
+        self.clients: dict[tuple[str, bool], CachedTwitch] = {}
+        self.locks: dict[tuple[str, bool], asyncio.Lock] = {}
+
+        self.app_token: str | None = None
+        self.app_token_expires_at: float = 0
+
+        self._app_token_lock = asyncio.Lock()
+
+    async def _set_app_authentication(self, twitch: Twitch):
+        async with self._app_token_lock:
+            if self.app_token is not None and time.monotonic() < self.app_token_expires_at:
+                await twitch.set_app_authentication(self.app_token, SCOPES)
+                return
+
+            await twitch.authenticate_app(SCOPES)
+
+            self.app_token = twitch.get_app_token()
+            self.app_token_expires_at = time.monotonic() + config.TWITCH_APP_TOKEN_TTL
+
+    async def _set_user_authentication(self, twitch: Twitch, user: str, auto_refresh_auth: bool) -> float:
+        token, refresh_token = await TokenStorage.get(user)
+        refresh_token = refresh_token if auto_refresh_auth else None
+
+        val_result = await validate_token(token, auth_base_url=twitch.auth_base_url)
+        scopes = val_result.get("scopes", [])
+
+        if val_result.get("status", 200) == 200 and all(s in scopes for s in SCOPES):
+            await twitch.set_user_authentication(token, SCOPES, refresh_token=refresh_token, validate=False)
+        else:
+            # Let twitchAPI refresh the token when allowed, or raise the proper error
+            await twitch.set_user_authentication(token, SCOPES, refresh_token=refresh_token)
+            val_result = await validate_token(twitch.get_user_auth_token(), auth_base_url=twitch.auth_base_url)
+
+        expires_in = val_result.get("expires_in") or config.TWITCH_CLIENT_CACHE_MAX_TTL
+        ttl = min(expires_in, config.TWITCH_CLIENT_CACHE_MAX_TTL) - config.TWITCH_CLIENT_CACHE_EXPIRY_MARGIN
 
-    twitch.user_auth_refresh_callback = lambda a, r: TokenStorage.save(user, a, r)
-    twitch.auto_refresh_auth = auto_refresh_auth
+        return time.monotonic() + max(ttl, 0)
 
-    token, refresh_token = await TokenStorage.get(user)
-    await twitch.set_user_authentication(
-        token,
-        SCOPES,
-        refresh_token=refresh_token if auto_refresh_auth else None
-    )
+    async def _create(self, user: str, auto_refresh_auth: bool) -> CachedTwitch:
+        twitch = Twitch(
+            config.TWITCH_CLIENT_ID,
+            config.TWITCH_CLIENT_SECRET
+        )
 
-    await twitch.authenticate_app(SCOPES)
+        twitch.user_auth_refresh_callback = lambda a, r: TokenStorage.save(user, a, r)
+        twitch.auto_refresh_auth = auto_refresh_auth
 
-    return twitch
+        expires_at = await self._set_user_authentication(twitch, user, auto_refresh_auth)
+        await self._set_app_authentication(twitch)
+
+        return CachedTwitch(twitch, expires_at)
+
+    def _evict_idle(self):
+        for key, cached in list(self.clients.items()):
+            if cached.is_idle() or cached.is_expired():
+                del self.clients[key]
+
+                lock = self.locks.get(key)
+                if lock is not None and not lock.locked():
+                    del self.locks[key]
+
+    async def get(self, user: str, auto_refresh_auth: bool = False) -> Twitch:
+        self._evict_idle()
+
+        key = (user, auto_refresh_auth)
+
+        async with self.locks.setdefault(key, asyncio.Lock()):
+            cached = self.clients.get(key)
+
+            if cached is None or cached.is_expired():
+                cached = await self._create(user, auto_refresh_auth)
+                self.clients[key] = cached
+
+            cached.last_used_at = time.monotonic()
+
+            return cached.twitch
+
+
+twitch_clients = TwitchClientCache()
+
+
+async def authorize(user: str, auto_refresh_auth: bool = False) -> Twitch:
+    return await twitch_clients.get(user, auto_refresh_auth)
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from twitchAPI.eventsub.websocket import EventSubWebsocket
+from twitchAPI.twitch import Twitch
+
+from core.config import config
+from core.http import http_manager, Upstream
+from core.redis import redis_manager
+
+from .authorize import authorize
+
+
+logger = logging.getLogger(__name__)
+
+
+TWITCH_API_URL = "https://api.twitch.tv/helix"
+
+
+async def _get_headers() -> dict[str, str]:
+    twitch = await authorize(config.TWITCH_EVENTSUB_USER)
+
+    return {
+        "Client-Id": config.TWITCH_CLIENT_ID,
+        "Authorization": f"Bearer {twitch.get_app_token()}",
+    }
+
+
+async def _create_or_update_conduit(shard_count: int) -> str:
+    headers = await _get_headers()
+
+    async with http_manager.connect(Upstream.TWITCH) as client:
+        response = await client.get(f"{TWITCH_API_URL}/eventsub/conduits", headers=headers)
+        response.raise_for_status()
+
+        conduits = response.json()["data"]
+
+        if not conduits:
+            response = await client.post(
+                f"{TWITCH_API_URL}/eventsub/conduits",
+                headers=headers,
+                json={"shard_count": shard_count}
+            )
+            response.raise_for_status()
+
+            conduit = response.json()["data"][0]
+            logger.info(f"Created conduit {conduit['id']} with {shard_count} shards")
+
+            return conduit["id"]
+
+        conduit = conduits[0]
+
+        if conduit["shard_count"] < shard_count:
+            response = await client.patch(
+                f"{TWITCH_API_URL}/eventsub/conduits",
+                headers=headers,
+                json={"id": conduit["id"], "shard_count": shard_count}
+            )
+            response.raise_for_status()
+
+            logger.info(f"Resized conduit {conduit['id']} to {shard_count} shards")
+
+        return conduit["id"]
+
+
+async def get_or_create_conduit(shard_count: int) -> str:
+    async with redis_manager.connect() as redis:
+        async with redis.lock("twitch_conduit", timeout=30):
+            return await _create_or_update_conduit(shard_count)
+
+
+async def assign_shard(conduit_id: str, shard_id: int, session_id: str):
+    headers = await _get_headers()
+
+    async with http_manager.connect(Upstream.TWITCH) as client:
+        response = await client.patch(
+            f"{TWITCH_API_URL}/eventsub/conduits/shards",
+            headers=headers,
+            json={
+                "conduit_id": conduit_id,
+                "shards": [{
+                    "id": str(shard_id),
+                    "transport": {"method": "websocket", "session_id": session_id},
+                }],
+            }
+        )
+        response.raise_for_status()
+
+        errors = response.json().get("errors") or []
+        if errors:
+            raise RuntimeError(f"Failed to assign shard {shard_id}: {errors}")
+
+    logger.info(f"Assigned shard {shard_id} of conduit {conduit_id} to session {session_id}")
+
+
+async def create_subscription(
+    sub_type: str,
+    version: str,
+    condition: dict[str, str],
+    transport: dict[str, str]
+):
+    headers = await _get_headers()
+
+    async with http_manager.connect(Upstream.TWITCH) as client:
+        response = await client.post(
+            f"{TWITCH_API_URL}/eventsub/subscriptions",
+            headers=headers,
+            json={
+                "type": sub_type,
+                "version": version,
+                "condition": condition,
+                "transport": transport,
+            }
+        )
+
+        if response.status_code == 409:
+            logger.warning(f"Subscription {sub_type} for {condition} already exists on another transport")
+            return
+
+        response.raise_for_status()
+
+
+class ConduitShardWebsocket(EventSubWebsocket):
+    def __init__(
+        self,
+        twitch: Twitch,
+        conduit_id: str,
+        shard_id: int,
+        handlers: dict[str, tuple[Callable[[Any], Awaitable[None]], type]]
+    ):
+        super().__init__(twitch=twitch)
+
+        self.service_loop = asyncio.get_running_loop()
+
+        self.conduit_id = conduit_id
+        self.shard_id = shard_id
+        self.handlers = handlers
+
+    async def _handle_welcome(self, data: dict):
+        # Events are routed here as soon as the shard is assigned, so the session must be active first
+        await super()._handle_welcome(data)
+
+        try:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+                assign_shard(self.conduit_id, self.shard_id, self.active_session.id),
+                self.service_loop
+            ))
+        except Exception as e:
+            logger.error(f"Failed to assign shard {self.shard_id}", exc_info=e)
+
+    async def _handle_notification(self, data: dict):
+        self._reset_timeout()
+
+        payload = data.get("payload", {})
+        sub_type = payload.get("subscription", {}).get("type")
+
+        handler = self.handlers.get(sub_type)
+        if handler is None:
+            logger.error(f"Received event for unknown subscription type {sub_type}")
+            return
+
+        callback, event = handler
+        future = asyncio.run_coroutine_threadsafe(callback(event(**payload)), self.service_loop)
+        future.add_done_callback(self._task_callback)
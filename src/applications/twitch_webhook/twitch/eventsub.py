@@ -0,0 +1,177 @@
+import asyncio
+import logging
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable
+
+from twitchAPI.eventsub.websocket import EventSubWebsocket
+from twitchAPI.oauth import validate_token
+from twitchAPI.twitch import Twitch
+
+from core.config import config
+
+from .authorize import authorize
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventSubLimitReached(RuntimeError):
+    pass
+
+
+class EventSubSession:
+    def __init__(self, twitch: Twitch):
+        self.eventsub = EventSubWebsocket(twitch=twitch)
+        self.subscriptions = 0
+
+        self.service_loop = asyncio.get_running_loop()
+
+    @staticmethod
+    def _log_callback_error(future: Future):
+        if not future.cancelled() and (e := future.exception()) is not None:
+            logger.error("EventSub callback failed", exc_info=e)
+
+    def bind(self, callback: Callable[[Any], Awaitable[None]]) -> Callable[[Any], Awaitable[None]]:
+        # Callbacks are invoked on the websocket thread; service-wide clients live on the service loop
+        async def handoff(event: Any):
+            future = asyncio.run_coroutine_threadsafe(callback(event), self.service_loop)
+            future.add_done_callback(self._log_callback_error)
+
+        return handoff
+
+    def is_full(self) -> bool:
+        return self.subscriptions >= config.TWITCH_EVENTSUB_SESSION_MAX_SUBSCRIPTIONS
+
+
+class EventSubUserSessions:
+    def __init__(self, user: str, twitch: Twitch):
+        self.user = user
+        self.twitch = twitch
+
+        self.sessions: list[EventSubSession] = []
+        self.total_cost = 0
+
+        self.lock = asyncio.Lock()
+        self.check_token_task: asyncio.Task | None = None
+
+    async def _open_session(self) -> EventSubSession:
+        logger.info(f"Opening EventSub session #{len(self.sessions) + 1} for {self.user}")
+
+        session = EventSubSession(self.twitch)
+        await asyncio.to_thread(session.eventsub.start)
+
+        self.sessions.append(session)
+
+        return session
+
+    async def reserve(self, cost: int) -> EventSubSession:
+        async with self.lock:
+            if self.total_cost + cost > config.TWITCH_EVENTSUB_MAX_TOTAL_COST:
+                raise EventSubLimitReached(f"EventSub subscription cost limit reached for {self.user}")
+
+            session = next((s for s in self.sessions if not s.is_full()), None)
+
+            if session is None:
+                if len(self.sessions) >= config.TWITCH_EVENTSUB_MAX_SESSIONS_PER_USER:
+                    raise EventSubLimitReached(f"EventSub session limit reached for {self.user}")
+
+                session = await self._open_session()
+
+            session.subscriptions += 1
+            self.total_cost += cost
+
+            return session
+
+    def release(self, session: EventSubSession, cost: int):
+        session.subscriptions -= 1
+        self.total_cost -= cost
+
+    async def check_token(self):
+        while True:
+            await asyncio.sleep(config.TWITCH_EVENTSUB_TOKEN_CHECK_INTERVAL)
+
+            token = self.twitch.get_user_auth_token()
+            assert token is not None
+
+            logger.info(f"Check token for {self.user}...")
+            val_result = await validate_token(token, auth_base_url=self.twitch.auth_base_url)
+            if val_result.get("status", 200) != 200:
+                await self.twitch.refresh_used_token()
+                logger.info(f"Token for {self.user} refreshed")
+
+    async def close(self):
+        if self.check_token_task is not None:
+            self.check_token_task.cancel()
+
+        for session in self.sessions:
+            try:
+                await session.eventsub.stop()
+            except Exception as e:
+                logger.error(f"Failed to stop EventSub session for {self.user}", exc_info=e)
+
+        self.sessions = []
+
+
+class EventSubConnectionManager:
+    def __init__(self):
+        self.users: dict[str, EventSubUserSessions] = {}
+
+        self._lock = asyncio.Lock()
+
+    async def _get_user_sessions(self, user: str) -> EventSubUserSessions:
+        async with self._lock:
+            user_sessions = self.users.get(user)
+
+            if user_sessions is None:
+                twitch = await authorize(user, auto_refresh_auth=True)
+
+                user_sessions = EventSubUserSessions(user, twitch)
+                user_sessions.check_token_task = asyncio.create_task(user_sessions.check_token())
+
+                self.users[user] = user_sessions
+
+            return user_sessions
+
+    async def subscribe(
+        self,
+        user: str,
+        listen: Callable[[EventSubSession], Awaitable[str]],
+        cost: int = 0,
+        fallback_user: str | None = None
+    ) -> str:
+        user_sessions = await self._get_user_sessions(user)
+
+        try:
+            session = await user_sessions.reserve(cost)
+        except EventSubLimitReached as e:
+            if fallback_user is None:
+                raise
+
+            # Subscriptions authorized by the fallback user themselves are free
+            logger.info(f"{e}, subscribing with {fallback_user} instead")
+            return await self.subscribe(fallback_user, listen)
+
+        try:
+            return await listen(session)
+        except Exception:
+            user_sessions.release(session, cost)
+            raise
+
+    def sessions_count(self) -> int:
+        return sum(len(user_sessions.sessions) for user_sessions in self.users.values())
+
+    async def run(self):
+        await asyncio.gather(*(
+            user_sessions.check_token_task
+            for user_sessions in self.users.values()
+            if user_sessions.check_token_task is not None
+        ))
+
+    async def close(self):
+        users, self.users = self.users, {}
+
+        for user_sessions in users.values():
+            await user_sessions.close()
+
+
+eventsub_manager = EventSubConnectionManager()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable
+
+from pydantic import BaseModel
+from twitchAPI.object.api import EventSubSubscription
+from twitchAPI.twitch import Twitch
+
+from core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+SubscriptionKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+ACTIVE_STATUSES = {"enabled", "webhook_callback_verification_pending"}
+
+
+def get_subscription_key(sub_type: str, version: str, condition: dict[str, str]) -> SubscriptionKey:
+    return (
+        sub_type,
+        version,
+        tuple(sorted((key, value) for key, value in condition.items() if value)),
+    )
+
+
+class EventSubscription(BaseModel):
+    type: str
+    version: str
+    condition: dict[str, str]
+
+    @property
+    def key(self) -> SubscriptionKey:
+        return get_subscription_key(self.type, self.version, self.condition)
+
+
+class SubscriptionReconciler:
+    def __init__(
+        self,
+        twitch: Twitch,
+        create: Callable[[EventSubscription], Awaitable[object]],
+        is_reusable: Callable[[EventSubSubscription], bool] | None
+    ):
+        self.twitch = twitch
+        self.create = create
+        self.is_reusable = is_reusable
+
+        self._semaphore = asyncio.Semaphore(config.TWITCH_EVENTSUB_RECONCILE_CONCURRENCY)
+
+    async def _list(self) -> list[EventSubSubscription]:
+        # Without a reuse check nothing listed can be ours, so nothing is listed or deleted
+        if self.is_reusable is None:
+            return []
+
+        return [sub async for sub in await self.twitch.get_eventsub_subscriptions()]
+
+    async def _with_backoff(self, name: str, action: Callable[[], Awaitable[object]]) -> bool:
+        for attempt in range(config.TWITCH_EVENTSUB_RECONCILE_MAX_RETRIES + 1):
+            try:
+                async with self._semaphore:
+                    await action()
+
+                return True
+            except Exception as e:
+                if attempt >= config.TWITCH_EVENTSUB_RECONCILE_MAX_RETRIES:
+                    logger.error(f"Failed to {name}", exc_info=e)
+                    return False
+
+            delay = min(
+                config.TWITCH_EVENTSUB_RECONCILE_BACKOFF_MAX,
+                config.TWITCH_EVENTSUB_RECONCILE_BACKOFF_BASE * 2 ** attempt
+            )
+            await asyncio.sleep(random.uniform(0, delay))
+
+        return False
+
+    def diff(
+        self,
+        desired: list[EventSubscription],
+        existing: list[EventSubSubscription]
+    ) -> tuple[list[EventSubscription], list[EventSubSubscription]]:
+        desired_by_key = {subscription.key: subscription for subscription in desired}
+
+        kept: set[SubscriptionKey] = set()
+        stale: list[EventSubSubscription] = []
+
+        for sub in existing:
+            key = get_subscription_key(sub.type, sub.version, sub.condition)
+            is_own = self.is_reusable(sub)
+
+            # Subscriptions of other deployments and unmanaged broadcasters are left alone
+            if key not in desired_by_key and not is_own:
+                continue
+
+            if key in desired_by_key and key not in kept and sub.status in ACTIVE_STATUSES and is_own:
+                kept.add(key)
+            else:
+                stale.append(sub)
+
+        missing = [subscription for key, subscription in desired_by_key.items() if key not in kept]
+
+        return missing, stale
+
+    async def reconcile(self, desired: list[EventSubscription]):
+        missing, stale = self.diff(desired, await self._list())
+
+        logger.info(
+            f"Reconciling EventSub subscriptions: {len(desired)} desired, "
+            f"{len(missing)} to create, {len(stale)} to delete"
+        )
+
+        deleted = await asyncio.gather(*[
+            self._with_backoff(
+                f"delete subscription {sub.id} ({sub.type})",
+                lambda sub=sub: self.twitch.delete_eventsub_subscription(sub.id)
+            )
+            for sub in stale
+        ])
+
+        created = await asyncio.gather(*[
+            self._with_backoff(
+                f"create subscription {subscription.type} for {subscription.condition}",
+                lambda subscription=subscription: self.create(subscription)
+            )
+            for subscription in missing
+        ])
+
+        logger.info(
+            f"EventSub subscriptions reconciled: {sum(created)}/{len(missing)} created, "
+            f"{sum(deleted)}/{len(stale)} deleted"
+        )
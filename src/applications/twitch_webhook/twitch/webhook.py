@@ -1,24 +1,31 @@
-from asyncio import sleep, gather, wait, FIRST_COMPLETED, create_task
+from asyncio import Event, to_thread
+import functools
 import logging
-from typing import Literal
+from typing import Any, Awaitable, Callable
 
-from twitchAPI.eventsub.websocket import EventSubWebsocket
-from twitchAPI.twitch import Twitch
-from twitchAPI.object.eventsub import StreamOnlineEvent, ChannelUpdateEvent, ChannelChatMessageEvent, ChannelPointsCustomRewardRedemptionAddEvent
-from twitchAPI.oauth import validate_token
+from twitchAPI.object.api import EventSubSubscription
+from twitchAPI.object.eventsub import StreamOnlineEvent, StreamOfflineEvent, ChannelUpdateEvent, ChannelChatMessageEvent, ChannelPointsCustomRewardRedemptionAddEvent
 
+from core.config import config
+from core.metrics import CHAT_MESSAGES_TOTAL, WORKFLOW_START_SECONDS
 from core.temporal import get_client
+from core.tracing import start_trace
 
 from applications.common.repositories.streamers import StreamerConfigRepository, StreamerConfig
 from applications.twitch_webhook.state import UpdateEvent, EventType
 from applications.twitch_webhook.messages_proc import MessageEvent
+from applications.twitch_webhook.poll_scheduler import poll_scheduler
 from applications.twitch_webhook.reward_redemption import RewardRedemption
-from applications.twitch_webhook.workflows.on_message import OnMessageWorkflow
+from applications.twitch_webhook.triggers import chat_rules
+from applications.twitch_webhook.workflows.chat import ChatWorkflow
 from applications.twitch_webhook.workflows.on_reward_redemption import OnRewardRedemptionWorkflow
 from applications.twitch_webhook.workflows.on_stream_online import OnStreamOnlineWorkflow
 from applications.twitch_webhook.workflows.on_channel_update import OnChannelUpdateWorkflow
 from applications.temporal_worker.queues import MAIN_QUEUE
 from .authorize import authorize
+from .conduit import ConduitShardWebsocket, create_subscription, get_or_create_conduit
+from .eventsub import EventSubSession, eventsub_manager
+from .reconciler import EventSubscription, SubscriptionReconciler
 
 
 logging.basicConfig(level=logging.INFO)
@@ -30,204 +37,319 @@ logger.setLevel(logging.INFO)
 class TwitchService:
     ONLINE_NOTIFICATION_DELAY = 15 * 60
 
-    def __init__(self, twitch: Twitch, streamer: StreamerConfig):
-        self.twitch = twitch
+    def __init__(self, streamer: StreamerConfig):
         self.streamer = streamer
 
-        self.failed = False
-
     async def on_channel_update(self, event: ChannelUpdateEvent):
-        client = await get_client()
-
-        await client.start_workflow(
-            OnChannelUpdateWorkflow.run,
-            args=(
-                UpdateEvent(
-                    broadcaster_user_id=event.event.broadcaster_user_id,
-                    broadcaster_user_login=event.event.broadcaster_user_login,
-                    title=event.event.title,
-                    category_name=event.event.category_name
+        with (
+            start_trace("twitch.channel_update", broadcaster_user_id=event.event.broadcaster_user_id) as trace,
+            WORKFLOW_START_SECONDS.labels(OnChannelUpdateWorkflow.__name__).time()
+        ):
+            client = await get_client()
+
+            await client.start_workflow(
+                OnChannelUpdateWorkflow.run,
+                args=(
+                    UpdateEvent(
+                        broadcaster_user_id=event.event.broadcaster_user_id,
+                        broadcaster_user_login=event.event.broadcaster_user_login,
+                        title=event.event.title,
+                        category_name=event.event.category_name
+                    ),
+                    EventType.CHANNEL_UPDATE,
+                    trace,
                 ),
-                EventType.CHANNEL_UPDATE,
-            ),
-            id=f"on-channel-update-{event.event.broadcaster_user_id}",
-            task_queue=MAIN_QUEUE
-        )
+                id=f"on-channel-update-{event.event.broadcaster_user_id}",
+                task_queue=MAIN_QUEUE
+            )
 
     async def on_stream_online(self, event: StreamOnlineEvent):
-        client = await get_client()
+        await poll_scheduler.on_online(int(event.event.broadcaster_user_id))
 
-        await client.start_workflow(
-            OnStreamOnlineWorkflow.run,
-            args=(
-                int(event.event.broadcaster_user_id),
-                EventType.STREAM_ONLINE
-            ),
-            id=f"on-stream-online-{event.event.broadcaster_user_id}",
-            task_queue=MAIN_QUEUE
-        )
+        with (
+            start_trace("twitch.stream_online", broadcaster_user_id=event.event.broadcaster_user_id) as trace,
+            WORKFLOW_START_SECONDS.labels(OnStreamOnlineWorkflow.__name__).time()
+        ):
+            client = await get_client()
+
+            await client.start_workflow(
+                OnStreamOnlineWorkflow.run,
+                args=(
+                    int(event.event.broadcaster_user_id),
+                    EventType.STREAM_ONLINE,
+                    trace,
+                ),
+                id=f"on-stream-online-{event.event.broadcaster_user_id}",
+                task_queue=MAIN_QUEUE
+            )
+
+    async def on_stream_offline(self, event: StreamOfflineEvent):
+        await poll_scheduler.on_offline(int(event.event.broadcaster_user_id))
 
     async def on_channel_points_custom_reward_redemption_add(
         self,
         event: ChannelPointsCustomRewardRedemptionAddEvent
     ):
-        client = await get_client()
-
-        await client.start_workflow(
-            OnRewardRedemptionWorkflow.run,
-            RewardRedemption.from_twitch_event(event),
-            id=f"on-reward-redemption-{event.event.broadcaster_user_id}-{event.event.reward.id}",
-            task_queue=MAIN_QUEUE
-        )
+        with WORKFLOW_START_SECONDS.labels(OnRewardRedemptionWorkflow.__name__).time():
+            client = await get_client()
+
+            await client.start_workflow(
+                OnRewardRedemptionWorkflow.run,
+                RewardRedemption.from_twitch_event(event),
+                id=f"on-reward-redemption-{event.event.broadcaster_user_id}-{event.event.reward.id}",
+                task_queue=MAIN_QUEUE
+            )
 
     async def on_message(self, event: ChannelChatMessageEvent):
-        client = await get_client()
+        chatbots = await StreamerConfigRepository.find_by_chatbot_chat_id(int(event.event.broadcaster_user_id))
 
-        await client.start_workflow(
-            OnMessageWorkflow.run,
-            MessageEvent.from_twitch_event(
-                self.streamer.twitch.name,
-                event
-            ),
-            id=f"on-message-{event.event.broadcaster_user_id}-{event.event.message_id}",
-            task_queue=MAIN_QUEUE
-        )
+        # Subscriptions outlive config changes until the next reconcile, so drop chats the bot has left
+        if all(chatbot.twitch.id != self.streamer.twitch.id for chatbot in chatbots):
+            CHAT_MESSAGES_TOTAL.labels("dropped").inc()
+            return
 
-    async def _clean_subs(self, method: str, streamer: StreamerConfig):
-        match method:
-            case "listen_channel_update_v2":
-                sub_type = "channel.update"
-            case "listen_stream_online":
-                sub_type = "stream.online"
-            case "listen_channel_chat_message":
-                sub_type = "channel.chat.message"
-            case "listen_channel_points_custom_reward_redemption_add":
-                sub_type = "channel.channel_points_custom_reward_redemption.add"
-            case _:
-                raise ValueError("Unknown method")
+        message = MessageEvent.from_twitch_event(self.streamer.twitch.name, event)
 
-        subs = await self.twitch.get_eventsub_subscriptions(
-            user_id=str(streamer.twitch.id)
-        )
+        if not await chat_rules.should_dispatch(message):
+            CHAT_MESSAGES_TOTAL.labels("dropped").inc()
+            return
 
-        for sub in subs.data:
-            if sub.type == sub_type:
-                try:
-                    await self.twitch.delete_eventsub_subscription(sub.id)
-                except Exception as e:
-                    logger.error(f"Failed to delete subscription {sub.id}", exc_info=e)
-
-    async def subscribe_with_retry(
-            self,
-            method: Literal["listen_channel_update_v2"]
-                | Literal["listen_stream_online"]
-                | Literal["listen_channel_chat_message"]
-                | Literal["listen_channel_points_custom_reward_redemption_add"],
-            eventsub: EventSubWebsocket,
-            streamer: StreamerConfig,
-            retry: int = 10
-        ):
-        await self._clean_subs(method, streamer)
+        CHAT_MESSAGES_TOTAL.labels("dispatched").inc()
 
-        try:
-            match method:
-                case "listen_channel_update_v2":
-                    await eventsub.listen_channel_update_v2(str(streamer.twitch.id), self.on_channel_update)
-                case "listen_stream_online":
-                    await eventsub.listen_stream_online(str(streamer.twitch.id), self.on_stream_online)
-                case "listen_channel_points_custom_reward_redemption_add":
-                    await eventsub.listen_channel_points_custom_reward_redemption_add(
-                        str(streamer.twitch.id),
-                        self.on_channel_points_custom_reward_redemption_add
-                    )
-                case "listen_channel_chat_message":
-                    chatbot_in_chats = streamer.chatbot_in_chats or []
-
-                    for chat_id in chatbot_in_chats:
-                        await eventsub.listen_channel_chat_message(
-                            str(chat_id),
-                            str(streamer.twitch.id),
-                            self.on_message
-                        )
-                case _:
-                    raise ValueError("Unknown method")
+        with WORKFLOW_START_SECONDS.labels(ChatWorkflow.__name__).time():
+            client = await get_client()
 
-            return
-        except Exception as e:
-            if retry <= 0:
-                raise e
-
-        await sleep(1)
-        await self.subscribe_with_retry(method, eventsub, streamer, retry - 1)
-
-    async def subscribe_to_streamer(self, eventsub: EventSubWebsocket, streamer: StreamerConfig):
-        logger.info(f"Subscribe to events for {streamer.twitch.name}")
-        await gather(
-            self.subscribe_with_retry("listen_channel_update_v2", eventsub, streamer),
-            self.subscribe_with_retry("listen_stream_online", eventsub, streamer),
-            self.subscribe_with_retry("listen_channel_points_custom_reward_redemption_add", eventsub, streamer),
-            self.subscribe_with_retry("listen_channel_chat_message", eventsub, streamer),
-        )
-        logger.info(f"Subscribe to events for {streamer.twitch.name} done")
+            await client.start_workflow(
+                ChatWorkflow.run,
+                id=ChatWorkflow.get_id(self.streamer.twitch.name, event.event.broadcaster_user_id),
+                task_queue=MAIN_QUEUE,
+                start_signal="on_message",
+                start_signal_args=[message]
+            )
 
-    async def _check_token(self):
-        assert self.twitch._user_auth_token is not None
+    @classmethod
+    async def _listen(cls, subscription: EventSubscription, session: EventSubSession) -> str:
+        callback, _ = cls.get_event_handlers()[subscription.type]
+        callback = session.bind(callback)
+
+        eventsub = session.eventsub
+        condition = subscription.condition
+
+        match subscription.type:
+            case "channel.update":
+                return await eventsub.listen_channel_update_v2(condition["broadcaster_user_id"], callback)
+            case "stream.online":
+                return await eventsub.listen_stream_online(condition["broadcaster_user_id"], callback)
+            case "stream.offline":
+                return await eventsub.listen_stream_offline(condition["broadcaster_user_id"], callback)
+            case "channel.channel_points_custom_reward_redemption.add":
+                return await eventsub.listen_channel_points_custom_reward_redemption_add(
+                    condition["broadcaster_user_id"],
+                    callback
+                )
+            case "channel.chat.message":
+                return await eventsub.listen_channel_chat_message(
+                    condition["broadcaster_user_id"],
+                    condition["user_id"],
+                    callback
+                )
+            case _:
+                raise ValueError("Unknown subscription type")
 
-        while True:
-            for _ in range(60):
-                if self.failed:
-                    return
+    @classmethod
+    async def _create_websocket_subscription(cls, subscription: EventSubscription):
+        # Subscriptions authorized by the broadcaster (or the chatting user) are free, others cost 1
+        fallback_user = None
+
+        match subscription.type:
+            case "channel.update" | "stream.online" | "stream.offline":
+                streamer = await StreamerConfigRepository.get_by_twitch_id(
+                    int(subscription.condition["broadcaster_user_id"])
+                )
+                user = config.TWITCH_EVENTSUB_USER
+                cost = 0 if streamer.twitch.name == user else 1
+
+                # Once the shared account runs out of budget, the broadcaster's own token subscribes for free
+                fallback_user = streamer.twitch.name
+            case "channel.chat.message":
+                streamer = await StreamerConfigRepository.get_by_twitch_id(int(subscription.condition["user_id"]))
+                user = streamer.twitch.name
+                cost = 0
+            case _:
+                streamer = await StreamerConfigRepository.get_by_twitch_id(
+                    int(subscription.condition["broadcaster_user_id"])
+                )
+                user = streamer.twitch.name
+                cost = 0
+
+        await eventsub_manager.subscribe(
+            user,
+            functools.partial(cls._listen, subscription),
+            cost=cost,
+            fallback_user=fallback_user
+        )
 
-                await sleep(1)
+    @classmethod
+    async def reconcile(
+        cls,
+        create: Callable[[EventSubscription], Awaitable[object]],
+        is_reusable: Callable[[EventSubSubscription], bool] | None
+    ):
+        streamers = await StreamerConfigRepository.all()
 
-            logger.info("Check token...")
-            val_result = await validate_token(
-                self.twitch._user_auth_token,
-                auth_base_url=self.twitch.auth_base_url
-            )
-            if val_result.get('status', 200) != 200:
-                await self.twitch.refresh_used_token()
-                logger.info("Token refreshed")
+        reconciler = SubscriptionReconciler(
+            await authorize(config.TWITCH_EVENTSUB_USER),
+            create,
+            is_reusable
+        )
 
-    async def run(self) -> None:
-        eventsub = EventSubWebsocket(twitch=self.twitch)
+        await reconciler.reconcile([
+            subscription
+            for streamer in streamers
+            for subscription in cls.get_event_subscriptions(streamer)
+        ])
+
+    @classmethod
+    async def start_websocket(cls):
+        logger.info("Starting Twitch service...")
 
         try:
-            eventsub.start()
+            # Websocket subscriptions die with their session, and the app token listing also
+            # returns other deployments' conduit and webhook subscriptions, so only create
+            await cls.reconcile(cls._create_websocket_subscription, None)
 
-            logger.info("Subscribe to events...")
-            await self.subscribe_to_streamer(eventsub, self.streamer)
-            logger.info("Twitch service started")
+            logger.info(f"Twitch service started with {eventsub_manager.sessions_count()} EventSub sessions")
 
-            await self._check_token()
+            await eventsub_manager.run()
         finally:
             logger.info("Twitch service stopping...")
-            await eventsub.stop()
+            await eventsub_manager.close()
 
-    @classmethod
-    async def _start_for_streamer(cls, streamer: StreamerConfig):
-        try:
-            twith = await authorize(streamer.twitch.name, auto_refresh_auth=True)
-            await cls(twith, streamer).run()
-        except Exception as e:
-            logger.error("Twitch service failed", exc_info=e)
+        logger.info("Twitch service stopped")
 
     @classmethod
-    async def start(cls):
-        logger.info("Starting Twitch service...")
+    async def _dispatch(cls, handler: str, condition_key: str, event):
+        streamer = await StreamerConfigRepository.get_by_twitch_id(
+            int(event.subscription.condition[condition_key])
+        )
 
-        streamers = await StreamerConfigRepository.all()
+        await getattr(cls(streamer), handler)(event)
+
+    @classmethod
+    def get_event_handlers(cls) -> dict[str, tuple[Callable[[Any], Awaitable[None]], type]]:
+        return {
+            "channel.update": (
+                functools.partial(cls._dispatch, "on_channel_update", "broadcaster_user_id"),
+                ChannelUpdateEvent
+            ),
+            "stream.online": (
+                functools.partial(cls._dispatch, "on_stream_online", "broadcaster_user_id"),
+                StreamOnlineEvent
+            ),
+            "stream.offline": (
+                functools.partial(cls._dispatch, "on_stream_offline", "broadcaster_user_id"),
+                StreamOfflineEvent
+            ),
+            "channel.channel_points_custom_reward_redemption.add": (
+                functools.partial(cls._dispatch, "on_channel_points_custom_reward_redemption_add", "broadcaster_user_id"),
+                ChannelPointsCustomRewardRedemptionAddEvent
+            ),
+            "channel.chat.message": (
+                functools.partial(cls._dispatch, "on_message", "user_id"),
+                ChannelChatMessageEvent
+            ),
+        }
+
+    @staticmethod
+    def get_event_subscriptions(streamer: StreamerConfig) -> list[EventSubscription]:
+        broadcaster_id = str(streamer.twitch.id)
+
+        subscriptions = [
+            EventSubscription(type="channel.update", version="2", condition={"broadcaster_user_id": broadcaster_id}),
+            EventSubscription(type="stream.online", version="1", condition={"broadcaster_user_id": broadcaster_id}),
+            EventSubscription(type="stream.offline", version="1", condition={"broadcaster_user_id": broadcaster_id}),
+        ]
+
+        if streamer.notifications.redemption_reward is not None:
+            subscriptions.append(EventSubscription(
+                type="channel.channel_points_custom_reward_redemption.add",
+                version="1",
+                condition={"broadcaster_user_id": broadcaster_id}
+            ))
+
+        for chat_id in streamer.chatbot_in_chats or []:
+            subscriptions.append(EventSubscription(
+                type="channel.chat.message",
+                version="1",
+                condition={"broadcaster_user_id": str(chat_id), "user_id": broadcaster_id}
+            ))
+
+        return subscriptions
 
-        await wait(
-            [
-                create_task(cls._start_for_streamer(streamer))
-                for streamer in streamers
-            ],
-            return_when=FIRST_COMPLETED
+    @classmethod
+    async def reconcile_transport(cls, transport: dict[str, str], is_reusable: Callable[[EventSubSubscription], bool]):
+        await cls.reconcile(
+            lambda subscription: create_subscription(
+                subscription.type,
+                subscription.version,
+                subscription.condition,
+                transport
+            ),
+            is_reusable
         )
 
-        await gather(
-            *[cls._start_for_streamer(streamer) for streamer in streamers]
+    @classmethod
+    async def start_conduit(cls):
+        logger.info(f"Starting Twitch service as conduit shard {config.TWITCH_CONDUIT_SHARD_ID}...")
+
+        conduit_id = await get_or_create_conduit(config.TWITCH_CONDUIT_SHARD_COUNT)
+
+        twitch = await authorize(config.TWITCH_EVENTSUB_USER, auto_refresh_auth=True)
+        shard = ConduitShardWebsocket(
+            twitch,
+            conduit_id,
+            config.TWITCH_CONDUIT_SHARD_ID,
+            cls.get_event_handlers()
         )
 
+        await to_thread(shard.start)
+
+        try:
+            await cls.reconcile_transport(
+                {"method": "conduit", "conduit_id": conduit_id},
+                lambda sub: sub.transport.get("conduit_id") == conduit_id
+            )
+
+            logger.info(f"Twitch service started on conduit {conduit_id}")
+
+            await Event().wait()
+        finally:
+            logger.info("Twitch service stopping...")
+            await shard.stop()
+
         logger.info("Twitch service stopped")
+
+    @classmethod
+    async def start_webhook(cls):
+        logger.info("Subscribing webhook transport...")
+
+        await cls.reconcile_transport(
+            {
+                "method": "webhook",
+                "callback": config.TWITCH_CALLBACK_URL,
+                "secret": config.TWITCH_EVENTSUB_SECRET,
+            },
+            lambda sub: sub.transport.get("callback") == config.TWITCH_CALLBACK_URL
+        )
+
+        logger.info(f"Webhook transport subscribed, events are delivered to {config.TWITCH_CALLBACK_URL}")
+
+    @classmethod
+    async def start(cls):
+        match config.TWITCH_EVENTSUB_TRANSPORT:
+            case "conduit":
+                await cls.start_conduit()
+            case "webhook":
+                await cls.start_webhook()
+            case _:
+                await cls.start_websocket()
@@ -1,11 +1,12 @@
+from asyncio import gather
 from datetime import datetime, timezone, timedelta
 
 from twitchAPI.helper import first
 
-from core.redis import redis_manager
+from core.tracing import span
 from applications.common.repositories.streamers import StreamerConfigRepository
 
-from .state import State, StateManager, EventType
+from .state import PendingNotification, State, StateManager, StoredState, EventType
 from .sent_notifications import SentNotificationRepository, SentNotificationType
 from .notification import delete_penultimate_notification, notify
 from .twitch.authorize import authorize
@@ -18,9 +19,10 @@ class StateWatcher:
     async def get_twitch_state(cls, streamer_id: int) -> State | None:
         twitch = await authorize("kurbezz")
 
-        stream = await first(
-            twitch.get_streams(user_id=[str(streamer_id)])
-        )
+        with span("twitch.get_streams"):
+            stream = await first(
+                twitch.get_streams(user_id=[str(streamer_id)])
+            )
 
         if stream is None:
             return None
@@ -31,6 +33,27 @@ class StateWatcher:
             last_live_at=datetime.now(timezone.utc)
         )
 
+    @classmethod
+    def get_notification_type(
+        cls,
+        event_type: EventType,
+        last_state: State | None,
+        current_state: State
+    ) -> SentNotificationType | None:
+        if last_state is None:
+            return SentNotificationType.START_STREAM
+
+        if (
+            event_type == EventType.STREAM_ONLINE and
+            datetime.now(timezone.utc) - last_state.last_live_at >= cls.START_STREAM_THRESHOLD
+        ):
+            return SentNotificationType.START_STREAM
+
+        if last_state != current_state:
+            return SentNotificationType.CHANGE_CATEGORY
+
+        return None
+
     @classmethod
     async def notify_and_save(
         cls,
@@ -40,7 +63,11 @@ class StateWatcher:
     ):
         streamer = await StreamerConfigRepository.get_by_twitch_id(streamer_id)
 
-        sent_result = await notify(sent_notification_type, streamer, state)
+        with span("notify", notification_type=sent_notification_type):
+            sent_result, previous_notification = await gather(
+                notify(sent_notification_type, streamer, state),
+                SentNotificationRepository.get_last_for_streamer(streamer_id)
+            )
 
         await SentNotificationRepository.add(
             streamer.twitch.id,
@@ -49,37 +76,11 @@ class StateWatcher:
             sent_result=sent_result
         )
 
-    @classmethod
-    async def remove_previous_notifications(cls, streamer_id: int):
-        streamer = await StreamerConfigRepository.get_by_twitch_id(streamer_id)
-
-        penultimate_notification = await SentNotificationRepository.get_penultimate_for_streamer(streamer_id)
-
-        if penultimate_notification is None:
-            return
-
-        await delete_penultimate_notification(streamer, penultimate_notification)
-
-    @classmethod
-    async def notify_start_stream(
-        cls,
-        streamer_id: int,
-        state: State
-    ):
-        await cls.notify_and_save(streamer_id, SentNotificationType.START_STREAM, state)
-        await cls.remove_previous_notifications(streamer_id)
+        if previous_notification is not None:
+            await delete_penultimate_notification(streamer, previous_notification)
 
     @classmethod
-    async def notify_change_category(
-        cls,
-        streamer_id: int,
-        state: State
-    ):
-        await cls.notify_and_save(streamer_id, SentNotificationType.CHANGE_CATEGORY, state)
-        await cls.remove_previous_notifications(streamer_id)
-
-    @classmethod
-    async def _on_stream_state_change(
+    async def on_stream_state_change(
         cls,
         streamer_id: int,
         event_type: EventType,
@@ -93,34 +94,60 @@ class StateWatcher:
         if current_state is None:
             return
 
-        last_state = await StateManager.get(streamer_id)
-        if last_state is None:
-            await cls.notify_start_stream(streamer_id, current_state)
-            await StateManager.update(streamer_id, current_state)
-            return
+        def decide(last_state: StoredState | None) -> SentNotificationType | None:
+            notification_type = cls.get_notification_type(event_type, last_state, current_state)
+            pending = last_state.pending_notification if last_state is not None else None
 
-        if (
-            event_type == EventType.STREAM_ONLINE and
-            datetime.now(timezone.utc) - last_state.last_live_at >= cls.START_STREAM_THRESHOLD
-        ):
-            await cls.notify_start_stream(streamer_id, current_state)
-            await StateManager.update(streamer_id, current_state)
-            return
+            # A newer change supersedes an unsent one, but never downgrades a stream start
+            if (
+                notification_type is not None and
+                pending is not None and
+                pending.notification_type == SentNotificationType.START_STREAM
+            ):
+                return SentNotificationType.START_STREAM
 
-        if last_state != current_state:
-            await cls.notify_change_category(streamer_id, current_state)
-            await StateManager.update(streamer_id, current_state)
+            return notification_type
+
+        pending = await StateManager.transition(streamer_id, current_state, decide)
+        if pending is None:
             return
 
-        await StateManager.update(streamer_id, current_state)
+        await cls.send_pending(streamer_id, pending)
 
     @classmethod
-    async def on_stream_state_change(
-        cls,
-        streamer_id: int,
-        event_type: EventType,
-        new_state: State | None = None
-    ):
-        async with redis_manager.connect() as redis:
-            async with redis.lock(f"on_stream_state_change:{streamer_id}"):
-                await cls._on_stream_state_change(streamer_id, event_type, new_state)
+    async def send_pending(cls, streamer_id: int, pending: PendingNotification):
+        try:
+            await cls.notify_and_save(
+                streamer_id,
+                SentNotificationType(pending.notification_type),
+                pending.state
+            )
+        except Exception:
+            await StateManager.release_notification(streamer_id, pending.id)
+            raise
+
+        await StateManager.complete_notification(streamer_id, pending.id)
+
+    @classmethod
+    async def refresh_unchanged(cls, states: dict[int, State]) -> dict[int, State]:
+        last_states = await StateManager.get_many(list(states))
+
+        changed: dict[int, State] = {}
+        unchanged: list[int] = []
+
+        for streamer_id, state in states.items():
+            last_state = last_states.get(streamer_id)
+
+            # Unsent notifications go through the transition again so they can be claimed and retried
+            if (
+                last_state is not None and
+                last_state.pending_notification is None and
+                cls.get_notification_type(EventType.UNKNOWN, last_state, state) is None
+            ):
+                unchanged.append(streamer_id)
+            else:
+                changed[streamer_id] = state
+
+        await StateManager.refresh_many(unchanged, datetime.now(timezone.utc))
+
+        return changed
@@ -1,14 +1,14 @@
+from .chat import ChatWorkflow
 from .checker import StreamsCheckWorkflow
 from .on_channel_update import OnChannelUpdateWorkflow
-from .on_message import OnMessageWorkflow
 from .on_reward_redemption import OnRewardRedemptionWorkflow
 from .on_stream_online import OnStreamOnlineWorkflow
 
 
 __all__ = [
+    "ChatWorkflow",
     "StreamsCheckWorkflow",
     "OnChannelUpdateWorkflow",
-    "OnMessageWorkflow",
     "OnRewardRedemptionWorkflow",
     "OnStreamOnlineWorkflow",
 ]
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import timedelta
+
+from temporalio import workflow
+
+from applications.twitch_webhook.messages_proc import MessageEvent
+from applications.twitch_webhook.activities.message_proc import on_messages_activity
+from applications.temporal_worker.queues import MAIN_QUEUE
+
+
+@workflow.defn
+class ChatWorkflow:
+    BATCH_SIZE = 50
+    IDLE_TIMEOUT = timedelta(minutes=10)
+    MAX_MESSAGES_PER_RUN = 1000
+
+    def __init__(self):
+        self.pending: list[MessageEvent] = []
+        self.processed = 0
+
+    @classmethod
+    def get_id(cls, received_as: str, broadcaster_user_id: str) -> str:
+        return f"chat-{received_as}-{broadcaster_user_id}"
+
+    @workflow.signal
+    def on_message(self, message: MessageEvent):
+        self.pending.append(message)
+
+    def _should_continue_as_new(self) -> bool:
+        return self.processed >= self.MAX_MESSAGES_PER_RUN or workflow.info().is_continue_as_new_suggested()
+
+    @workflow.run
+    async def run(self, pending: list[MessageEvent] | None = None) -> None:
+        self.pending = [*(pending or []), *self.pending]
+
+        while True:
+            try:
+                await workflow.wait_condition(lambda: bool(self.pending), timeout=self.IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                if not self.pending:
+                    return
+
+            batch, self.pending = self.pending[:self.BATCH_SIZE], self.pending[self.BATCH_SIZE:]
+
+            await workflow.execute_activity(
+                on_messages_activity,
+                batch,
+                task_queue=MAIN_QUEUE,
+                schedule_to_close_timeout=timedelta(minutes=5)
+            )
+
+            self.processed += len(batch)
+
+            if self._should_continue_as_new():
+                await workflow.wait_condition(workflow.all_handlers_finished)
+                workflow.continue_as_new(self.pending)
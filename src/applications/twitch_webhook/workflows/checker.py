@@ -19,15 +19,16 @@ class StreamsCheckWorkflow:
                     task_queue=MAIN_QUEUE,
                 ),
                 spec=ScheduleSpec(
-                    intervals=[ScheduleIntervalSpec(every=timedelta(minutes=2))]
+                    intervals=[ScheduleIntervalSpec(every=timedelta(minutes=1))]
                 )
             )
         }
 
     @workflow.run
     async def run(self):
-        await workflow.start_activity(
+        await workflow.execute_activity(
             check_streams_states,
             task_queue=MAIN_QUEUE,
-            schedule_to_close_timeout=timedelta(minutes=1)
+            schedule_to_close_timeout=timedelta(minutes=1),
+            heartbeat_timeout=timedelta(seconds=20)
         )
@@ -2,6 +2,8 @@ from datetime import timedelta
 
 from temporalio import workflow
 
+from core.tracing import TraceContext
+
 from applications.temporal_worker.queues import MAIN_QUEUE
 from applications.twitch_webhook.activities.on_state_change import OnChannelUpdateActivity, on_channel_update_activity
 from applications.twitch_webhook.state import UpdateEvent, EventType
@@ -14,12 +16,14 @@ class OnChannelUpdateWorkflow:
         self,
         event: UpdateEvent,
         event_type: EventType,
+        trace: TraceContext | None = None,
     ):
         await workflow.start_activity(
             on_channel_update_activity,
             OnChannelUpdateActivity(
                 event=event,
                 event_type=event_type,
+                trace=trace,
             ),
             task_queue=MAIN_QUEUE,
             start_to_close_timeout=timedelta(minutes=1),
@@ -2,6 +2,8 @@ from datetime import timedelta
 
 from temporalio import workflow
 
+from core.tracing import TraceContext
+
 from applications.twitch_webhook.activities.on_state_change import on_stream_state_change_activity, OnStreamStateChangeActivity
 from applications.twitch_webhook.state import EventType
 from applications.temporal_worker.queues import MAIN_QUEUE
@@ -10,12 +12,18 @@ from applications.temporal_worker.queues import MAIN_QUEUE
 @workflow.defn
 class OnStreamOnlineWorkflow:
     @workflow.run
-    async def run(self, broadcaster_user_id: str | int, event_type: EventType):
+    async def run(
+        self,
+        broadcaster_user_id: str | int,
+        event_type: EventType,
+        trace: TraceContext | None = None,
+    ):
         await workflow.start_activity(
             on_stream_state_change_activity,
             OnStreamStateChangeActivity(
                 streamer_id=int(broadcaster_user_id),
-                event_type=event_type
+                event_type=event_type,
+                trace=trace,
             ),
             task_queue=MAIN_QUEUE,
             schedule_to_close_timeout=timedelta(minutes=1)
@@ -1,5 +1,8 @@
 from fastapi import FastAPI
+from prometheus_client import make_asgi_app
 
+from core.http import http_manager
+from core.migrations import run_migrations
 from core.mongo import mongo_manager
 from core.redis import redis_manager
 from core.broker import broker
@@ -17,6 +20,8 @@ def get_app() -> FastAPI:
     for route in routes:
         app.include_router(route)
 
+    app.mount("/metrics", make_asgi_app(), name="metrics")
+
     app.mount(
         "/",
         SPAStaticFiles(
@@ -31,9 +36,15 @@ def get_app() -> FastAPI:
         await mongo_manager.init()
         await redis_manager.init()
 
+        await run_migrations()
+
         if not broker.is_worker_process:
             await broker.startup()
 
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await http_manager.close()
+
     return app
 
 
@@ -1,11 +1,13 @@
 from fastapi import APIRouter
 
 from .auth import auth_router
+from .eventsub import eventsub_router
 from .streamer import streamer_router
 
 
 routes: list[APIRouter] = [
     auth_router,
+    eventsub_router,
     streamer_router,
 ]
 
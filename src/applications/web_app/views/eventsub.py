@@ -0,0 +1,102 @@
+import hashlib
+import hmac
+import json
+import logging
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from core.config import config
+from core.redis import redis_manager
+from applications.twitch_webhook.twitch.webhook import TwitchService
+
+
+logger = logging.getLogger(__name__)
+
+
+eventsub_router = APIRouter(prefix="/api/twitch", tags=["twitch"])
+
+
+MESSAGE_ID_HEADER = "Twitch-Eventsub-Message-Id"
+MESSAGE_TIMESTAMP_HEADER = "Twitch-Eventsub-Message-Timestamp"
+MESSAGE_SIGNATURE_HEADER = "Twitch-Eventsub-Message-Signature"
+MESSAGE_TYPE_HEADER = "Twitch-Eventsub-Message-Type"
+
+
+def verify_signature(message_id: str, timestamp: str, body: bytes, signature: str) -> bool:
+    expected = hmac.new(
+        config.TWITCH_EVENTSUB_SECRET.encode(),
+        message_id.encode() + timestamp.encode() + body,
+        hashlib.sha256
+    ).hexdigest()
+
+    return hmac.compare_digest(f"sha256={expected}", signature)
+
+
+def is_fresh(timestamp: str) -> bool:
+    try:
+        sent_at = datetime.fromisoformat(timestamp)
+    except ValueError:
+        return False
+
+    age = (datetime.now(timezone.utc) - sent_at).total_seconds()
+
+    return age <= config.TWITCH_EVENTSUB_MESSAGE_MAX_AGE
+
+
+@eventsub_router.post("/eventsub/")
+async def eventsub_callback(request: Request) -> Response:
+    message_id = request.headers.get(MESSAGE_ID_HEADER, "")
+    timestamp = request.headers.get(MESSAGE_TIMESTAMP_HEADER, "")
+    signature = request.headers.get(MESSAGE_SIGNATURE_HEADER, "")
+    message_type = request.headers.get(MESSAGE_TYPE_HEADER, "")
+
+    body = await request.body()
+
+    if not config.TWITCH_EVENTSUB_SECRET or not verify_signature(message_id, timestamp, body, signature):
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    if not is_fresh(timestamp):
+        raise HTTPException(status_code=403, detail="Message is too old")
+
+    payload = json.loads(body)
+    subscription = payload.get("subscription", {})
+
+    match message_type:
+        case "webhook_callback_verification":
+            return Response(content=payload["challenge"], media_type="text/plain")
+        case "revocation":
+            logger.warning(
+                f"Subscription {subscription.get('id')} ({subscription.get('type')}) "
+                f"revoked: {subscription.get('status')}"
+            )
+            return Response(status_code=204)
+        case "notification":
+            pass
+        case _:
+            raise HTTPException(status_code=400, detail="Unknown message type")
+
+    key = f"eventsub_message:{message_id}"
+
+    async with redis_manager.connect() as redis:
+        is_new = await redis.set(key, 1, nx=True, ex=config.TWITCH_EVENTSUB_MESSAGE_MAX_AGE)
+
+    if not is_new:
+        return Response(status_code=204)
+
+    handler = TwitchService.get_event_handlers().get(subscription.get("type"))
+    if handler is None:
+        logger.error(f"Received event for unknown subscription type {subscription.get('type')}")
+        return Response(status_code=204)
+
+    callback, event = handler
+
+    try:
+        await callback(event(**payload))
+    except Exception:
+        async with redis_manager.connect() as redis:
+            await redis.delete(key)
+
+        raise
+
+    return Response(status_code=204)
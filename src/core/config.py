@@ -13,20 +13,112 @@ class Config(BaseSettings):
 
     TWITCH_ADMIN_USER_ID: str
 
+    TWITCH_APP_TOKEN_TTL: int = 24 * 60 * 60
+    TWITCH_CLIENT_CACHE_MAX_TTL: int = 60 * 60
+    TWITCH_CLIENT_CACHE_IDLE_TTL: int = 15 * 60
+    TWITCH_CLIENT_CACHE_EXPIRY_MARGIN: int = 60
+
+    TWITCH_EVENTSUB_USER: str = "kurbezz"
+    TWITCH_EVENTSUB_SESSION_MAX_SUBSCRIPTIONS: int = 300
+    TWITCH_EVENTSUB_MAX_SESSIONS_PER_USER: int = 3
+    TWITCH_EVENTSUB_MAX_TOTAL_COST: int = 10
+    TWITCH_EVENTSUB_TOKEN_CHECK_INTERVAL: int = 60
+    TWITCH_EVENTSUB_TRANSPORT: str = "websocket"
+    TWITCH_EVENTSUB_RECONCILE_CONCURRENCY: int = 8
+    TWITCH_EVENTSUB_RECONCILE_MAX_RETRIES: int = 5
+    TWITCH_EVENTSUB_RECONCILE_BACKOFF_BASE: float = 0.5
+    TWITCH_EVENTSUB_RECONCILE_BACKOFF_MAX: float = 30
+
+    TWITCH_CONDUIT_SHARD_COUNT: int = 1
+    TWITCH_CONDUIT_SHARD_ID: int = 0
+
     TWITCH_CALLBACK_URL: str
     TWITCH_CALLBACK_PORT: int = 80
 
+    TWITCH_EVENTSUB_SECRET: str = ""
+    TWITCH_EVENTSUB_MESSAGE_MAX_AGE: int = 10 * 60
+
     MONGODB_URI: str
 
+    STREAMERS_CACHE_TTL: float = 60
+    STREAMERS_CACHE_CHANGE_STREAM_AWAIT_MS: int = 10_000
+    STREAMERS_CACHE_CHANGE_STREAM_RETRY_INTERVAL: float = 60
+
     REDIS_URI: str
 
+    MIGRATIONS_LOCK_TIMEOUT: float = 10 * 60
+
     WEB_APP_HOST: str
 
     SECRET_KEY: str
 
     OPENAI_API_KEY: str
 
+    CHAT_HISTORY_CHANNEL_LIMIT: int = 1000
+    CHAT_HISTORY_CHANNEL_LIMITS: dict[str, int] = {}
+    CHAT_HISTORY_TTL: int = 24 * 60 * 60
+    CHAT_MESSAGE_PROCESSED_TTL: int = 60 * 60
+
     TEMPOLAR_URL: str = "temporal:7233"
+    TEMPORAL_HEALTH_CHECK_INTERVAL: float = 30
+    TEMPORAL_HEALTH_CHECK_TIMEOUT: float = 5
+
+    METRICS_PORT: int = 9100
+    METRICS_BACKLOG_INTERVAL: float = 15
+
+    TRACING_EXPORTER: str = "none"
+    TRACING_SERVICE_NAME: str = "discord-bot"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_FLUSH_INTERVAL: float = 5
+
+    HTTP_HTTP2: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 60
+    HTTP_CONNECT_TIMEOUT: float = 5
+
+    HTTP_DISCORD_TIMEOUT: float = 10
+    HTTP_TELEGRAM_TIMEOUT: float = 10
+    HTTP_TWITCH_TIMEOUT: float = 10
+    HTTP_OPENROUTER_TIMEOUT: float = 60
+    HTTP_TRACING_TIMEOUT: float = 5
+
+    OPENROUTER_API_URL: str = "https://openrouter.ai/api/v1/chat/completions"
+    OPENROUTER_MODEL: str = "deepseek/deepseek-chat-v3-0324:free"
+    OPENROUTER_STREAMING: bool = True
+
+    CHAT_MESSAGE_MAX_LENGTH: int = 255
+    CHAT_MESSAGE_MIN_LENGTH: int = 20
+
+    AI_CHANNEL_CONCURRENCY: int = 2
+    AI_CHANNEL_MAX_QUEUED: int = 10
+    AI_COALESCE_WINDOW: float = 2
+    AI_COMPLETION_CACHE_TTL: int = 60
+
+    RATE_LIMITER_MAX_RETRIES: int = 5
+    TELEGRAM_GLOBAL_MESSAGES_PER_SECOND: float = 30
+    TELEGRAM_CHAT_MESSAGE_INTERVAL: float = 1
+
+    TWITCH_STREAMS_CHECK_FETCH_CONCURRENCY: int = 8
+    TWITCH_STREAMS_CHECK_CONCURRENCY: int = 20
+    TWITCH_STREAMS_CHECK_HEARTBEAT_INTERVAL: float = 5
+
+    TWITCH_POLL_LIVE_INTERVAL: float = 2 * 60
+    TWITCH_POLL_SCHEDULED_INTERVAL: float = 60
+    TWITCH_POLL_IDLE_INTERVAL: float = 15 * 60
+    TWITCH_POLL_SCHEDULE_WINDOW_BEFORE: float = 15 * 60
+    TWITCH_POLL_SCHEDULE_WINDOW_AFTER: float = 60 * 60
+    TWITCH_SCHEDULE_CACHE_TTL: int = 12 * 60 * 60
+
+    STREAM_NOTIFICATION_CLAIM_TIMEOUT: int = 5 * 60
+
+    TWITCH_CHAT_CHANNEL_MESSAGES_PER_30S: float = 20
+    TWITCH_CHAT_MODERATOR_MESSAGES_PER_30S: float = 100
+    TWITCH_CHAT_SENDER_MESSAGES_PER_30S: float = 100
+    TWITCH_CHAT_SEND_MAX_RETRIES: int = 3
+    TWITCH_CHAT_DROP_BACKOFF: float = 5
+    TWITCH_CHAT_CLOSE_TIMEOUT: float = 10
 
 
 config = Config()
@@ -0,0 +1,66 @@
+import contextlib
+from enum import StrEnum
+
+from httpx import AsyncClient, Limits, Timeout
+
+from core.config import config
+
+
+class Upstream(StrEnum):
+    DISCORD = "discord"
+    TELEGRAM = "telegram"
+    TWITCH = "twitch"
+    OPENROUTER = "openrouter"
+    TRACING = "tracing"
+
+
+def get_upstream_timeout(upstream: Upstream) -> float:
+    return {
+        Upstream.DISCORD: config.HTTP_DISCORD_TIMEOUT,
+        Upstream.TELEGRAM: config.HTTP_TELEGRAM_TIMEOUT,
+        Upstream.TWITCH: config.HTTP_TWITCH_TIMEOUT,
+        Upstream.OPENROUTER: config.HTTP_OPENROUTER_TIMEOUT,
+        Upstream.TRACING: config.HTTP_TRACING_TIMEOUT,
+    }[upstream]
+
+
+def create_http_client(upstream: Upstream) -> AsyncClient:
+    return AsyncClient(
+        http2=config.HTTP_HTTP2,
+        limits=Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=Timeout(
+            get_upstream_timeout(upstream),
+            connect=config.HTTP_CONNECT_TIMEOUT,
+        ),
+    )
+
+
+class HTTPClientManager:
+    def __init__(self):
+        self.clients: dict[Upstream, AsyncClient] = {}
+
+    def get(self, upstream: Upstream) -> AsyncClient:
+        client = self.clients.get(upstream)
+
+        if client is None or client.is_closed:
+            client = create_http_client(upstream)
+            self.clients[upstream] = client
+
+        return client
+
+    async def close(self):
+        clients, self.clients = self.clients, {}
+
+        for client in clients.values():
+            await client.aclose()
+
+    @contextlib.asynccontextmanager
+    async def connect(self, upstream: Upstream):
+        yield self.get(upstream)
+
+
+http_manager = HTTPClientManager()
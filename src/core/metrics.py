@@ -0,0 +1,68 @@
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from core.config import config
+
+
+RATE_LIMITER_WAIT_SECONDS = Histogram(
+    "rate_limiter_wait_seconds",
+    "Time spent waiting for an upstream rate limit bucket",
+    ["upstream"],
+)
+
+ACTIVITY_DURATION_SECONDS = Histogram(
+    "temporal_activity_duration_seconds",
+    "Duration of temporal activity executions",
+    ["activity", "outcome"],
+)
+
+WORKFLOW_START_SECONDS = Histogram(
+    "temporal_workflow_start_seconds",
+    "Time to start a temporal workflow from an incoming event",
+    ["workflow"],
+)
+
+TASK_QUEUE_BACKLOG = Gauge(
+    "temporal_task_queue_backlog",
+    "Approximate number of tasks waiting in a temporal task queue",
+    ["task_queue"],
+)
+
+MONGO_OPERATION_SECONDS = Histogram(
+    "mongo_operation_seconds",
+    "Duration of mongo collection operations",
+    ["collection", "operation"],
+)
+
+REDIS_OPERATION_SECONDS = Histogram(
+    "redis_operation_seconds",
+    "Duration of redis commands",
+    ["command"],
+)
+
+CHAT_MESSAGES_TOTAL = Counter(
+    "twitch_chat_messages_total",
+    "Chat messages received by the webhook, by whether they were dispatched to temporal",
+    ["outcome"],
+)
+
+AI_REQUESTS_TOTAL = Counter(
+    "ai_requests_total",
+    "AI reply requests by scheduling outcome",
+    ["outcome"],
+)
+
+TWITCH_CHAT_OUTBOUND_TOTAL = Counter(
+    "twitch_chat_outbound_messages_total",
+    "Outbound twitch chat messages by delivery outcome",
+    ["outcome"],
+)
+
+WORKER_STARTUP_SECONDS = Gauge(
+    "temporal_worker_startup_seconds",
+    "Time spent in each temporal worker startup phase",
+    ["phase"],
+)
+
+
+def start_metrics_server():
+    start_http_server(config.METRICS_PORT)
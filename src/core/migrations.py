@@ -0,0 +1,148 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from mongojet import Database, OperationFailure
+
+from core.config import config
+from core.mongo import mongo_manager
+from core.redis import redis_manager
+
+
+logger = logging.getLogger(__name__)
+
+
+MIGRATIONS_COLLECTION = "migrations"
+MIGRATIONS_LOCK_KEY = "migrations:lock"
+
+
+IndexKeys = list[tuple[str, int]]
+
+
+INITIAL_INDEXES: dict[str, list[IndexKeys]] = {
+    "streamers": [
+        [("twitch.id", 1)],
+        [("integrations.discord.guild_id", 1), ("integrations.discord.games_list.channel_id", 1)],
+    ],
+    "sent_notifications": [
+        [("twitch_id", 1), ("sent_at", -1)],
+    ],
+    "stream_twitch_state": [
+        [("twitch_id", 1)],
+    ],
+    "secrets": [
+        [("type", 1), ("twitch_login", 1)],
+    ],
+    "games_list_data": [
+        [("twitch_id", 1)],
+    ],
+    "users": [
+        [("oauths.twitch.id", 1)],
+    ],
+}
+
+
+async def create_indexes(db: Database, indexes: dict[str, list[IndexKeys]]):
+    for collection_name, collection_indexes in indexes.items():
+        for keys in collection_indexes:
+            await db[collection_name].create_index(keys)
+
+
+async def create_initial_indexes(db: Database):
+    await create_indexes(db, INITIAL_INDEXES)
+
+
+async def make_stream_state_unique(db: Database):
+    collection = db["stream_twitch_state"]
+
+    cursor = await collection.aggregate([
+        {"$sort": {"last_live_at": -1}},
+        {"$group": {"_id": "$twitch_id", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ])
+
+    async for group in cursor:
+        await collection.delete_many({"_id": {"$in": group["ids"][1:]}})
+
+    try:
+        await collection.drop_index("twitch_id_1")
+    except OperationFailure as e:
+        logger.info(f"Index twitch_id_1 is already gone: {e}")
+
+    await collection.create_index([("twitch_id", 1)], unique=True)
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Database], Awaitable[None]]]] = [
+    (1, "initial_indexes", create_initial_indexes),
+    (2, "unique_stream_state", make_stream_state_unique),
+]
+
+
+# Query shapes issued by repositories, checked against the planner at startup
+QUERY_SHAPES: list[tuple[str, dict[str, Any], dict[str, int] | None]] = [
+    ("streamers", {"twitch.id": 0}, None),
+    ("streamers", {"integrations.discord.guild_id": 0, "integrations.discord.games_list.channel_id": 0}, None),
+    ("sent_notifications", {"twitch_id": 0}, {"sent_at": -1}),
+    ("stream_twitch_state", {"twitch_id": 0}, None),
+    ("secrets", {"type": "twitch_token", "twitch_login": ""}, None),
+    ("games_list_data", {"twitch_id": 0}, None),
+    ("users", {"oauths.twitch.id": ""}, None),
+]
+
+
+def has_collection_scan(plan: dict) -> bool:
+    if plan.get("stage") == "COLLSCAN":
+        return True
+
+    children = [plan[key] for key in ("inputStage", "queryPlan") if key in plan]
+    children += plan.get("inputStages", [])
+
+    return any(has_collection_scan(child) for child in children)
+
+
+async def report_collection_scans(db: Database) -> list[tuple[str, dict[str, Any]]]:
+    scans = []
+
+    for collection_name, filter, sort in QUERY_SHAPES:
+        command: dict[str, Any] = {"find": collection_name, "filter": filter}
+        if sort is not None:
+            command["sort"] = sort
+
+        try:
+            result = await db.run_command({"explain": command, "verbosity": "queryPlanner"})
+        except Exception as e:
+            logger.error(f"Failed to explain query on {collection_name}", exc_info=e)
+            continue
+
+        if has_collection_scan(result["queryPlanner"]["winningPlan"]):
+            logger.warning(f"Query on {collection_name} falls back to a collection scan: {filter}")
+            scans.append((collection_name, filter))
+
+    return scans
+
+
+async def run_migrations():
+    async with mongo_manager.connect() as client, redis_manager.connect() as redis:
+        db = client.get_default_database()
+        collection = db[MIGRATIONS_COLLECTION]
+
+        # Every service runs migrations on startup, only one of them applies each version
+        async with redis.lock(MIGRATIONS_LOCK_KEY, timeout=config.MIGRATIONS_LOCK_TIMEOUT):
+            cursor = await collection.find()
+            applied = {doc["_id"] async for doc in cursor}
+
+            for version, name, migrate in MIGRATIONS:
+                if version in applied:
+                    continue
+
+                logger.info(f"Applying migration {version} ({name})...")
+
+                await migrate(db)
+
+                await collection.update_one(
+                    {"_id": version},
+                    {"$set": {"name": name, "applied_at": datetime.now(timezone.utc)}},
+                    upsert=True
+                )
+
+        await report_collection_scans(db)
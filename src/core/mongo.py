@@ -1,12 +1,58 @@
 import contextlib
+import functools
+import inspect
 
 from mongojet import create_client
 
 from core.config import config
+from core.metrics import MONGO_OPERATION_SECONDS
+from core.tracing import span
+
+
+class TimedCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.collection, name)
+        if not inspect.iscoroutinefunction(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def timed(*args, **kwargs):
+            with (
+                span(f"mongo.{self.collection.name}.{name}"),
+                MONGO_OPERATION_SECONDS.labels(self.collection.name, name).time()
+            ):
+                return await attr(*args, **kwargs)
+
+        return timed
+
+
+class TimedDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, name: str) -> TimedCollection:
+        return TimedCollection(self.database[name])
+
+    def __getattr__(self, name: str):
+        return getattr(self.database, name)
+
+
+class TimedClient:
+    def __init__(self, client):
+        self.client = client
+
+    def get_default_database(self, *args, **kwargs) -> TimedDatabase:
+        return TimedDatabase(self.client.get_default_database(*args, **kwargs))
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
 
 
 async def create_mongo_client():
-    return await create_client(config.MONGODB_URI)
+    return TimedClient(await create_client(config.MONGODB_URI))
 
 
 class MongoDBSessionManager:
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from httpx import Response
+from redis.exceptions import RedisError
+
+from core.config import config
+from core.http import Upstream
+from core.metrics import RATE_LIMITER_WAIT_SECONDS
+from core.redis import redis_manager
+from core.tracing import span
+
+
+logger = logging.getLogger(__name__)
+
+
+GLOBAL_ROUTE = "global"
+
+
+class RateLimiter:
+    def __init__(self, upstream: Upstream):
+        self.upstream = upstream
+
+    def _key(self, route: str) -> str:
+        return f"rate_limit:{self.upstream}:{route}"
+
+    def _pace_key(self, route: str) -> str:
+        return f"rate_limit_pace:{self.upstream}:{route}"
+
+    async def _blocked_for(self, route: str) -> float:
+        async with redis_manager.connect() as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.pttl(self._key(route))
+                pipe.pttl(self._key(GLOBAL_ROUTE))
+                ttls = await pipe.execute()
+
+        return max([0, *ttls]) / 1000
+
+    async def _pace(self, route: str, interval: float) -> float:
+        async with redis_manager.connect() as redis:
+            acquired = await redis.set(self._pace_key(route), 1, nx=True, px=int(interval * 1000))
+            if acquired:
+                return 0
+
+            ttl = await redis.pttl(self._pace_key(route))
+
+        return max(ttl, 1) / 1000
+
+    def get_pace_intervals(self, route: str) -> list[tuple[str, float]]:
+        return []
+
+    async def wait(self, route: str):
+        started_at = time.monotonic()
+
+        with span("rate_limiter.wait", upstream=self.upstream, route=route):
+            try:
+                while True:
+                    delay = await self._blocked_for(route)
+
+                    if delay <= 0:
+                        for pace_route, interval in self.get_pace_intervals(route):
+                            delay = max(delay, await self._pace(pace_route, interval))
+
+                            if delay > 0:
+                                break
+
+                    if delay <= 0:
+                        break
+
+                    await asyncio.sleep(delay)
+            except RedisError as e:
+                logger.error(f"Rate limiter for {self.upstream} is unavailable", exc_info=e)
+
+        RATE_LIMITER_WAIT_SECONDS.labels(self.upstream).observe(time.monotonic() - started_at)
+
+    async def block(self, route: str, seconds: float):
+        if seconds <= 0:
+            return
+
+        try:
+            async with redis_manager.connect() as redis:
+                await redis.set(self._key(route), 1, px=int(seconds * 1000))
+        except RedisError as e:
+            logger.error(f"Rate limiter for {self.upstream} is unavailable", exc_info=e)
+
+    async def update(self, route: str, response: Response):
+        pass
+
+    async def request(self, route: str, send: Callable[[], Awaitable[Response]]) -> Response:
+        retry = config.RATE_LIMITER_MAX_RETRIES
+
+        while True:
+            await self.wait(route)
+
+            response = await send()
+            await self.update(route, response)
+
+            if response.status_code != 429 or retry <= 0:
+                return response
+
+            retry -= 1
+
+            logger.warning(f"Rate limited by {self.upstream} on {route}, retrying...")
+
+
+class DiscordRateLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(Upstream.DISCORD)
+
+    async def update(self, route: str, response: Response):
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get("retry_after", 1))
+            except ValueError:
+                retry_after = float(response.headers.get("Retry-After", 1))
+
+            if response.headers.get("X-RateLimit-Global", "").lower() == "true":
+                await self.block(GLOBAL_ROUTE, retry_after)
+            else:
+                await self.block(route, retry_after)
+
+            return
+
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            await self.block(route, float(response.headers.get("X-RateLimit-Reset-After", 1)))
+
+
+class TelegramRateLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(Upstream.TELEGRAM)
+
+    def get_pace_intervals(self, route: str) -> list[tuple[str, float]]:
+        return [
+            (GLOBAL_ROUTE, 1 / config.TELEGRAM_GLOBAL_MESSAGES_PER_SECOND),
+            (route, config.TELEGRAM_CHAT_MESSAGE_INTERVAL),
+        ]
+
+    async def update(self, route: str, response: Response):
+        if response.status_code != 429:
+            return
+
+        try:
+            retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+        except ValueError:
+            retry_after = 1
+
+        await self.block(route, retry_after)
+
+
+class TwitchChatRateLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(Upstream.TWITCH)
+
+    @staticmethod
+    def get_route(sender_id: str, channel_id: str) -> str:
+        return f"chat:{sender_id}:{channel_id}"
+
+    def get_pace_intervals(self, route: str) -> list[tuple[str, float]]:
+        _, sender_id, channel_id = route.split(":")
+
+        if sender_id == channel_id:
+            channel_limit = config.TWITCH_CHAT_MODERATOR_MESSAGES_PER_30S
+        else:
+            channel_limit = config.TWITCH_CHAT_CHANNEL_MESSAGES_PER_30S
+
+        return [
+            (f"chat:{sender_id}", 30 / config.TWITCH_CHAT_SENDER_MESSAGES_PER_30S),
+            (route, 30 / channel_limit),
+        ]
+
+
+discord_rate_limiter = DiscordRateLimiter()
+telegram_rate_limiter = TelegramRateLimiter()
+twitch_chat_rate_limiter = TwitchChatRateLimiter()
@@ -1,12 +1,19 @@
 import contextlib
 
-from redis.asyncio import from_url
+from redis.asyncio import Redis
 
 from core.config import config
+from core.metrics import REDIS_OPERATION_SECONDS
+
+
+class TimedRedis(Redis):
+    async def execute_command(self, *args, **options):
+        with REDIS_OPERATION_SECONDS.labels(str(args[0])).time():
+            return await super().execute_command(*args, **options)
 
 
 def create_redis_pool():
-    return from_url(config.REDIS_URI)
+    return TimedRedis.from_url(config.REDIS_URI)
 
 
 class RedisSessionManager:
@@ -1,10 +1,142 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from temporalio import activity
+from temporalio.api.enums.v1 import DescribeTaskQueueMode
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.api.workflowservice.v1 import DescribeTaskQueueRequest
 from temporalio.client import Client
 from temporalio.contrib.pydantic import pydantic_data_converter
+from temporalio.service import RPCError
+from temporalio.worker import ActivityInboundInterceptor, ExecuteActivityInput, Interceptor
 
 from core.config import config
+from core.metrics import ACTIVITY_DURATION_SECONDS, TASK_QUEUE_BACKLOG
 
 
-async def get_client() -> Client:
+logger = logging.getLogger(__name__)
+
+
+async def create_temporal_client() -> Client:
     return await Client.connect(
         config.TEMPOLAR_URL, namespace="default", data_converter=pydantic_data_converter
     )
+
+
+class TemporalClientManager:
+    def __init__(self):
+        self.client: Client | None = None
+        self.last_health_check: float = 0
+
+        self._lock = asyncio.Lock()
+
+    async def init(self) -> Client:
+        async with self._lock:
+            if self.client is None:
+                self.client = await create_temporal_client()
+                self.last_health_check = time.monotonic()
+
+            return self.client
+
+    async def reconnect(self, stale: Client | None = None) -> Client:
+        async with self._lock:
+            if self.client is None or self.client is stale:
+                logger.warning("Reconnecting to temporal...")
+
+                self.client = await create_temporal_client()
+                self.last_health_check = time.monotonic()
+
+            return self.client
+
+    async def is_healthy(self) -> bool:
+        if self.client is None:
+            return False
+
+        try:
+            return await self.client.service_client.check_health(
+                timeout=timedelta(seconds=config.TEMPORAL_HEALTH_CHECK_TIMEOUT)
+            )
+        except (RPCError, asyncio.TimeoutError) as e:
+            logger.error("Temporal health check failed", exc_info=e)
+            return False
+
+    async def get(self) -> Client:
+        client = self.client
+        if client is None:
+            return await self.init()
+
+        if time.monotonic() - self.last_health_check < config.TEMPORAL_HEALTH_CHECK_INTERVAL:
+            return client
+
+        self.last_health_check = time.monotonic()
+
+        if await self.is_healthy():
+            return client
+
+        try:
+            return await self.reconnect(client)
+        except Exception:
+            self.last_health_check = 0
+            raise
+
+
+temporal_manager = TemporalClientManager()
+
+
+async def get_client() -> Client:
+    return await temporal_manager.get()
+
+
+class MetricsActivityInboundInterceptor(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput):
+        started_at = time.monotonic()
+        outcome = "success"
+
+        try:
+            return await super().execute_activity(input)
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "failure"
+            raise
+        finally:
+            ACTIVITY_DURATION_SECONDS.labels(
+                activity.info().activity_type, outcome
+            ).observe(time.monotonic() - started_at)
+
+
+class MetricsInterceptor(Interceptor):
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return MetricsActivityInboundInterceptor(next)
+
+
+async def get_task_queue_backlog(client: Client, task_queue: str) -> int:
+    response = await client.workflow_service.describe_task_queue(
+        DescribeTaskQueueRequest(
+            namespace=client.namespace,
+            task_queue=TaskQueue(name=task_queue),
+            api_mode=DescribeTaskQueueMode.DESCRIBE_TASK_QUEUE_MODE_ENHANCED,
+            report_stats=True,
+        )
+    )
+
+    return sum(
+        type_info.stats.approximate_backlog_count
+        for version_info in response.versions_info.values()
+        for type_info in version_info.types_info.values()
+    )
+
+
+async def report_task_queue_backlog(client: Client, task_queue: str):
+    while True:
+        try:
+            TASK_QUEUE_BACKLOG.labels(task_queue).set(
+                await get_task_queue_backlog(client, task_queue)
+            )
+        except RPCError as e:
+            logger.error(f"Failed to describe task queue {task_queue}", exc_info=e)
+
+        await asyncio.sleep(config.METRICS_BACKLOG_INTERVAL)
@@ -0,0 +1,206 @@
+import abc
+import asyncio
+import contextlib
+import json
+import logging
+import secrets
+import time
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from pydantic import BaseModel
+
+from core.config import config
+
+
+logger = logging.getLogger(__name__)
+
+
+class TraceContext(BaseModel):
+    trace_id: str
+    span_id: str | None = None
+
+
+class Span(BaseModel):
+    trace_id: str
+    span_id: str
+    parent_span_id: str | None
+    name: str
+    start_time: float
+    end_time: float | None = None
+    status: str = "ok"
+    attributes: dict[str, Any] = {}
+
+
+class SpanExporter(abc.ABC):
+    @abc.abstractmethod
+    def export(self, span: Span):
+        ...
+
+
+class NoopSpanExporter(SpanExporter):
+    def export(self, span: Span):
+        pass
+
+
+class BufferedSpanExporter(SpanExporter):
+    def __init__(self):
+        self.spans: list[Span] = []
+
+        self._flush_task: asyncio.Task | None = None
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(config.TRACING_FLUSH_INTERVAL)
+
+        spans, self.spans = self.spans, []
+        if not spans:
+            return
+
+        try:
+            await self._write(spans)
+        except Exception as e:
+            logger.error("Failed to export spans", exc_info=e)
+
+    @abc.abstractmethod
+    async def _write(self, spans: list[Span]):
+        ...
+
+
+class FileSpanExporter(BufferedSpanExporter):
+    def __init__(self, path: str):
+        super().__init__()
+
+        self.path = path
+
+    def _append(self, lines: list[str]):
+        with open(self.path, "a") as f:
+            f.writelines(lines)
+
+    async def _write(self, spans: list[Span]):
+        # File writes block, so they run off the event loop
+        await asyncio.to_thread(self._append, [span.model_dump_json() + "\n" for span in spans])
+
+
+class OTLPSpanExporter(BufferedSpanExporter):
+    def __init__(self, endpoint: str):
+        super().__init__()
+
+        self.endpoint = endpoint
+
+    def _to_otlp(self, span: Span) -> dict:
+        return {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": span.parent_span_id or "",
+            "name": span.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(span.start_time * 1e9)),
+            "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+            "status": {"code": 1 if span.status == "ok" else 2},
+            "attributes": [
+                {"key": key, "value": {"stringValue": str(value)}}
+                for key, value in span.attributes.items()
+            ],
+        }
+
+    async def _write(self, spans: list[Span]):
+        body = {
+            "resourceSpans": [{
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": config.TRACING_SERVICE_NAME}}]
+                },
+                "scopeSpans": [{"scope": {"name": "discord-bot"}, "spans": [self._to_otlp(span) for span in spans]}],
+            }]
+        }
+
+        from core.http import http_manager, Upstream
+
+        async with http_manager.connect(Upstream.TRACING) as client:
+            response = await client.post(
+                self.endpoint,
+                content=json.dumps(body),
+                headers={"Content-Type": "application/json"}
+            )
+            response.raise_for_status()
+
+
+def create_exporter() -> SpanExporter:
+    match config.TRACING_EXPORTER:
+        case "file":
+            return FileSpanExporter(config.TRACING_FILE_PATH)
+        case "otlp":
+            return OTLPSpanExporter(config.TRACING_OTLP_ENDPOINT)
+        case _:
+            return NoopSpanExporter()
+
+
+exporter = create_exporter()
+
+current_trace: ContextVar[TraceContext | None] = ContextVar("current_trace", default=None)
+
+
+def get_current_trace() -> TraceContext | None:
+    return current_trace.get()
+
+
+@contextlib.contextmanager
+def use_trace(trace: TraceContext | None) -> Iterator[TraceContext | None]:
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+
+
+@contextlib.contextmanager
+def _record(trace_id: str, parent_span_id: str | None, name: str, attributes: dict[str, Any]) -> Iterator[TraceContext]:
+    span = Span(
+        trace_id=trace_id,
+        span_id=secrets.token_hex(8),
+        parent_span_id=parent_span_id,
+        name=name,
+        start_time=time.time(),
+        attributes=attributes,
+    )
+
+    token = current_trace.set(TraceContext(trace_id=trace_id, span_id=span.span_id))
+
+    try:
+        yield TraceContext(trace_id=trace_id, span_id=span.span_id)
+    except BaseException as e:
+        span.status = "error"
+        span.attributes["error"] = repr(e)
+        raise
+    finally:
+        current_trace.reset(token)
+
+        span.end_time = time.time()
+
+        try:
+            exporter.export(span)
+        except Exception as e:
+            logger.error("Failed to export span", exc_info=e)
+
+
+@contextlib.contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[TraceContext]:
+    with _record(secrets.token_hex(16), None, name, attributes) as trace:
+        yield trace
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[TraceContext | None]:
+    parent = current_trace.get()
+
+    if parent is None:
+        yield None
+        return
+
+    with _record(parent.trace_id, parent.span_id, name, attributes) as trace:
+        yield trace
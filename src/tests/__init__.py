@@ -0,0 +1,20 @@
+import os
+
+
+# Settings required by core.config; tests never reach the real services
+for name, value in {
+    "DISCORD_BOT_TOKEN": "test",
+    "DISCORD_BOT_ID": "1",
+    "DISCORD_BOT_ACTIVITY": "test",
+    "TELEGRAM_BOT_TOKEN": "test",
+    "TWITCH_CLIENT_ID": "test",
+    "TWITCH_CLIENT_SECRET": "test",
+    "TWITCH_ADMIN_USER_ID": "1",
+    "TWITCH_CALLBACK_URL": "http://localhost/callback",
+    "MONGODB_URI": "mongodb://localhost/test",
+    "REDIS_URI": "redis://localhost",
+    "WEB_APP_HOST": "localhost",
+    "SECRET_KEY": "test",
+    "OPENAI_API_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
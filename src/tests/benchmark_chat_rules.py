@@ -0,0 +1,171 @@
+"""Replays a chat log through the chat rule matchers and reports their throughput.
+
+    python -m tests.benchmark_chat_rules [chat_log.jsonl] [--repeat N]
+
+Each log line holds message_id, chatter_user_login, text and is_reply, as recorded from
+channel.chat.message events. Defaults to tests/fixtures/chat_log.jsonl.
+"""
+import argparse
+import asyncio
+import json
+import re
+import time
+from pathlib import Path
+from unittest import mock
+
+from applications.common.domain.streamers import (
+    ChatRule, IntegrationsConfig, NotificationsConfig, StreamerConfig, TwitchConfig
+)
+from applications.common.repositories.streamers import StreamersSnapshot
+from applications.twitch_webhook import triggers
+from applications.twitch_webhook.messages_proc import ChatMessage, ChatMessageReplyMetadata, MessageEvent, MessageType
+from applications.twitch_webhook.triggers import DEFAULT_CHAT_RULES, IGNORED_CHATTER_LOGINS, ChatRulesPlan, ChatRulesRegistry
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "chat_log.jsonl"
+
+BROADCASTER_ID = "1"
+
+BENCHMARK_CHAT_RULES = [
+    *DEFAULT_CHAT_RULES,
+    ChatRule(name="link", regex=r"https?://\S+|discord\.gg/\S+", response="Без ссылок"),
+    ChatRule(name="rank", regex=r"\bна каком .*ранге\b", response="Секрет"),
+    ChatRule(name="ping", regex=r"\bping\s+\d{3,}", response="Перезайди"),
+]
+
+
+def load_messages(path: Path) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def to_event(message: dict) -> MessageEvent:
+    login = message["chatter_user_login"]
+
+    return MessageEvent(
+        received_as="kurbezz",
+        broadcaster_user_id=BROADCASTER_ID,
+        broadcaster_user_name="kurbezz",
+        broadcaster_user_login="kurbezz",
+        chatter_user_id=login,
+        chatter_user_name=login,
+        chatter_user_login=login,
+        message_id=message["message_id"],
+        message=ChatMessage(text=message["text"]),
+        message_type=MessageType.TEXT,
+        color="",
+        reply=ChatMessageReplyMetadata(
+            parent_message_id="parent",
+            parent_message_body="",
+            parent_user_id="parent",
+            parent_user_name="parent",
+            parent_user_login="parent",
+            thread_message_id="parent",
+            thread_user_id="parent",
+            thread_user_name="parent",
+            thread_user_login="parent",
+        ) if message["is_reply"] else None,
+        channel_points_custom_reward_id=None,
+    )
+
+
+def match_per_rule(rules: list[ChatRule], text: str, chatter_login: str) -> list[ChatRule]:
+    # Reference path: every rule checks the message on its own, like the handlers did before the plan
+    text = text.lower()
+    chatter_login = chatter_login.lower()
+
+    matched: list[ChatRule] = []
+    groups: set[str] = set()
+
+    for rule in rules:
+        if chatter_login in {login.lower() for login in rule.excluded_chatter_logins}:
+            continue
+
+        if rule.chatter_login_contains is not None and rule.chatter_login_contains.lower() not in chatter_login:
+            continue
+
+        if rule.group is not None and rule.group in groups:
+            continue
+
+        if not (
+            any(keyword.lower() in text for keyword in rule.keywords)
+            or (rule.prefix is not None and text.startswith(rule.prefix.lower()))
+            or (rule.regex is not None and re.search(rule.regex, text, re.IGNORECASE))
+        ):
+            continue
+
+        if rule.group is not None:
+            groups.add(rule.group)
+
+        matched.append(rule)
+
+    return matched
+
+
+def get_snapshot(rules: list[ChatRule]) -> StreamersSnapshot:
+    return StreamersSnapshot({
+        BROADCASTER_ID: StreamerConfig(
+            twitch=TwitchConfig(id=int(BROADCASTER_ID), name="kurbezz"),
+            notifications=NotificationsConfig(start_stream=""),
+            integrations=IntegrationsConfig(),
+            chat_rules=rules,
+        )
+    })
+
+
+def measure(name: str, count: int, run) -> float:
+    started_at = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started_at
+
+    print(f"{name:<28} {count / elapsed:>12,.0f} msg/s")
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("log", nargs="?", type=Path, default=FIXTURE)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    messages = load_messages(args.log) * args.repeat
+    events = [to_event(message) for message in messages]
+
+    rules = BENCHMARK_CHAT_RULES
+
+    merged = ChatRulesPlan(rules)
+    per_rule_regex = ChatRulesPlan(rules)
+    per_rule_regex.regex = None
+
+    print(f"{len(messages)} messages, {len(rules)} rules")
+
+    measure("per-rule reference", len(messages), lambda: [
+        match_per_rule(rules, message["text"], message["chatter_user_login"]) for message in messages
+    ])
+    measure("plan, per-rule regex", len(messages), lambda: [
+        per_rule_regex.match(message["text"], message["chatter_user_login"]) for message in messages
+    ])
+    measure("plan, merged regex", len(messages), lambda: [
+        merged.match(message["text"], message["chatter_user_login"]) for message in messages
+    ])
+
+    registry = ChatRulesRegistry(IGNORED_CHATTER_LOGINS)
+
+    async def dispatch_all() -> int:
+        with mock.patch.object(triggers.streamers_cache, "get", mock.AsyncMock(return_value=get_snapshot(rules))):
+            return sum([await registry.should_dispatch(event) for event in events])
+
+    dispatched = 0
+
+    def run_dispatch():
+        nonlocal dispatched
+        dispatched = asyncio.run(dispatch_all())
+
+    measure("should_dispatch", len(events), run_dispatch)
+
+    print(f"dispatched {dispatched / len(events):.1%} of messages")
+
+
+if __name__ == "__main__":
+    main()
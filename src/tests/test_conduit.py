@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from aiohttp import ClientTimeout, web
+
+from applications.twitch_webhook.twitch import conduit
+from applications.twitch_webhook.twitch.conduit import ConduitShardWebsocket
+
+
+WELCOME = {
+    "metadata": {"message_type": "session_welcome"},
+    "payload": {
+        "session": {
+            "id": "session-1",
+            "status": "connected",
+            "keepalive_timeout_seconds": 10,
+            "reconnect_url": None,
+        },
+    },
+}
+
+NOTIFICATION = {
+    "metadata": {"message_type": "notification"},
+    "payload": {
+        "subscription": {"id": "subscription-1", "type": "stream.online"},
+        "event": {"broadcaster_user_id": "1"},
+    },
+}
+
+
+class ConduitShardWebsocketTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.assigned = asyncio.Event()
+        self.closed = asyncio.Event()
+
+        app = web.Application()
+        app.router.add_get("/ws", self.serve)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"ws://127.0.0.1:{port}/ws"
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def serve(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        await ws.send_json(WELCOME)
+
+        # Twitch only delivers notifications once the shard is assigned to the session
+        await self.assigned.wait()
+        await ws.send_json(NOTIFICATION)
+
+        async for _ in ws:
+            pass
+
+        self.closed.set()
+
+        return ws
+
+    async def test_assigns_shard_and_dispatches_on_service_loop(self):
+        service_loop = asyncio.get_running_loop()
+        received = asyncio.Event()
+        calls = []
+
+        async def assign_shard(conduit_id: str, shard_id: int, session_id: str):
+            calls.append(("assign", asyncio.get_running_loop(), conduit_id, shard_id, session_id))
+            self.assigned.set()
+
+        async def on_stream_online(event: dict):
+            calls.append(("event", asyncio.get_running_loop(), event["event"]))
+            received.set()
+
+        twitch = mock.Mock(session_timeout=ClientTimeout(total=5))
+        twitch.has_required_auth.return_value = True
+
+        with mock.patch.object(conduit, "assign_shard", assign_shard):
+            shard = ConduitShardWebsocket(twitch, "conduit-1", 2, {"stream.online": (on_stream_online, dict)})
+            shard.connection_url = self.url
+
+            await asyncio.to_thread(shard.start)
+
+            try:
+                await asyncio.wait_for(received.wait(), timeout=5)
+            finally:
+                # stop() blocks on the socket thread, which needs this loop to answer the close handshake
+                await asyncio.to_thread(asyncio.run, shard.stop())
+
+        self.assertEqual(calls, [
+            ("assign", service_loop, "conduit-1", 2, "session-1"),
+            ("event", service_loop, {"broadcaster_user_id": "1"}),
+        ])
+        await asyncio.wait_for(self.closed.wait(), timeout=5)
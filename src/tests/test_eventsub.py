@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+
+from applications.common.domain.streamers import IntegrationsConfig, NotificationsConfig, StreamerConfig, TwitchConfig
+from applications.twitch_webhook.twitch import eventsub, webhook
+from applications.twitch_webhook.twitch.eventsub import eventsub_manager
+from applications.twitch_webhook.twitch.webhook import TwitchService
+
+
+STREAMERS = [
+    StreamerConfig(
+        twitch=TwitchConfig(id=id, name=f"streamer{id}"),
+        notifications=NotificationsConfig(start_stream="started"),
+        integrations=IntegrationsConfig()
+    )
+    for id in range(1, 16)
+]
+
+
+class FakeEventSubWebsocket:
+    subscriptions: list[tuple[str, str, str]] = []
+
+    def __init__(self, twitch):
+        self.user = twitch.user
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def _listen(self, sub_type: str, broadcaster_user_id: str) -> str:
+        self.subscriptions.append((self.user, sub_type, broadcaster_user_id))
+        return f"{sub_type}-{broadcaster_user_id}"
+
+    async def listen_channel_update_v2(self, broadcaster_user_id: str, callback) -> str:
+        return await self._listen("channel.update", broadcaster_user_id)
+
+    async def listen_stream_online(self, broadcaster_user_id: str, callback) -> str:
+        return await self._listen("stream.online", broadcaster_user_id)
+
+    async def listen_stream_offline(self, broadcaster_user_id: str, callback) -> str:
+        return await self._listen("stream.offline", broadcaster_user_id)
+
+
+async def authorize(user: str, auto_refresh_auth: bool = False):
+    return mock.Mock(user=user)
+
+
+async def get_by_twitch_id(twitch_id: int) -> StreamerConfig:
+    return next(streamer for streamer in STREAMERS if streamer.twitch.id == twitch_id)
+
+
+class WebsocketSubscriptionTest(unittest.IsolatedAsyncioTestCase):
+    async def test_streamers_over_shared_budget_use_own_token(self):
+        FakeEventSubWebsocket.subscriptions = []
+
+        with (
+            mock.patch.object(eventsub, "EventSubWebsocket", FakeEventSubWebsocket),
+            mock.patch.object(eventsub, "authorize", authorize),
+            mock.patch.object(webhook, "authorize", authorize),
+            mock.patch.object(webhook.StreamerConfigRepository, "all", mock.AsyncMock(return_value=STREAMERS)),
+            mock.patch.object(webhook.StreamerConfigRepository, "get_by_twitch_id", get_by_twitch_id),
+            mock.patch.object(webhook.config, "TWITCH_EVENTSUB_USER", "streamer1"),
+            mock.patch.object(eventsub.config, "TWITCH_EVENTSUB_MAX_TOTAL_COST", 10),
+        ):
+            try:
+                await TwitchService.reconcile(TwitchService._create_websocket_subscription, None)
+            finally:
+                await eventsub_manager.close()
+
+        subscriptions = FakeEventSubWebsocket.subscriptions
+
+        self.assertEqual(
+            sorted((sub_type, broadcaster_id) for _, sub_type, broadcaster_id in subscriptions),
+            sorted(
+                (sub_type, str(streamer.twitch.id))
+                for streamer in STREAMERS
+                for sub_type in ("channel.update", "stream.online", "stream.offline")
+            )
+        )
+
+        shared = [sub for sub in subscriptions if sub[0] == "streamer1" and sub[2] != "1"]
+        self.assertEqual(len(shared), 10)
+
+        for user, _, broadcaster_id in subscriptions:
+            self.assertIn(user, ("streamer1", f"streamer{broadcaster_id}"))
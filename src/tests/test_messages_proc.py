@@ -0,0 +1,146 @@
+import json
+import unittest
+from unittest import mock
+
+from aiohttp import web
+
+from core.config import config
+from core.http import http_manager
+from applications.twitch_webhook import messages_proc
+from applications.twitch_webhook.messages_proc import (
+    ChatMessage,
+    MessageEvent,
+    MessageType,
+    MessagesProc,
+    split_completion,
+)
+
+
+ERROR_TEXT = "Something went wrong"
+
+
+def delta(content: str) -> str:
+    return json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+async def iter_deltas(deltas: list[str]):
+    for item in deltas:
+        yield item
+
+
+def get_event() -> MessageEvent:
+    return MessageEvent(
+        received_as="1",
+        broadcaster_user_id="1",
+        broadcaster_user_name="streamer",
+        broadcaster_user_login="streamer",
+        chatter_user_id="2",
+        chatter_user_name="chatter",
+        chatter_user_login="chatter",
+        message_id="message-1",
+        message=ChatMessage(text="@kurbezz hello"),
+        message_type=MessageType.TEXT,
+        color="",
+        reply=None,
+        channel_points_custom_reward_id=None,
+    )
+
+
+class StreamingCompletionTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.chunks: list[str] = []
+
+        app = web.Application()
+        app.router.add_post("/chat/completions", self.serve)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]
+
+        self.sent: list[str] = []
+
+        def send(twitch, broadcaster_id, sender_id, message, reply_parent_message_id=None):
+            self.sent.append(message)
+
+        for patcher in (
+            mock.patch.object(config, "OPENROUTER_API_URL", f"http://127.0.0.1:{port}/chat/completions"),
+            mock.patch.object(config, "OPENROUTER_STREAMING", True),
+            mock.patch.object(messages_proc.completion_cache, "get", mock.AsyncMock(return_value=None)),
+            mock.patch.object(messages_proc.completion_cache, "set", mock.AsyncMock()),
+            mock.patch.object(MessagesProc, "get_message_history_with_thread", mock.AsyncMock(return_value=[])),
+            mock.patch.object(MessagesProc, "update_message_history", mock.AsyncMock()),
+            mock.patch.object(messages_proc.chat_sender, "send", send),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await http_manager.close()
+        await self.runner.cleanup()
+
+    async def serve(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        assert body["stream"] is True
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+
+        for chunk in self.chunks:
+            await response.write(f"data: {chunk}\n\n".encode())
+
+        await response.write_eof()
+
+        return response
+
+    async def test_sends_parts_and_skips_malformed_chunks(self):
+        self.chunks = [
+            delta("Hello there, this is "),
+            delta("the first sentence. Second "),
+            "{not json",
+            delta("sentence follows here. "),
+            delta("Third one is short."),
+            "[DONE]",
+            delta("Never sent."),
+        ]
+
+        await MessagesProc._send_completion(mock.Mock(), get_event(), ERROR_TEXT)
+
+        self.assertEqual(
+            self.sent,
+            [
+                "Hello there, this is the first sentence.",
+                "Second sentence follows here. Third one is short.",
+            ]
+        )
+        messages_proc.completion_cache.set.assert_awaited_once()
+
+    async def test_error_payload_sends_error_text(self):
+        self.chunks = [
+            delta("Partial answer. "),
+            json.dumps({"error": {"code": 502, "message": "Provider returned error"}}),
+            "[DONE]",
+        ]
+
+        await MessagesProc._send_completion(mock.Mock(), get_event(), ERROR_TEXT)
+
+        self.assertEqual(self.sent, [ERROR_TEXT])
+        messages_proc.completion_cache.set.assert_not_awaited()
+
+
+class SplitCompletionTest(unittest.IsolatedAsyncioTestCase):
+    async def test_only_first_part_is_cut_early(self):
+        sentences = [f"Sentence number {index} is here." for index in range(20)]
+        deltas = [f"{sentence} " for sentence in sentences]
+
+        parts = [part async for part in split_completion(iter_deltas(deltas), 100, 20)]
+
+        self.assertEqual(parts[0], sentences[0])
+        self.assertEqual(" ".join(parts), " ".join(sentences))
+        self.assertTrue(all(len(part) <= 100 for part in parts))
+        self.assertTrue(all(len(part) > 60 for part in parts[1:-1]))
@@ -0,0 +1,63 @@
+import asyncio
+import contextlib
+import json
+import unittest
+from unittest import mock
+
+from applications.twitch_webhook import poll_scheduler as poll_scheduler_module
+from applications.twitch_webhook.poll_scheduler import PollScheduler
+
+
+class RefreshScheduledStartsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.redis = mock.AsyncMock()
+        self.stalled = asyncio.Event()
+
+        @contextlib.asynccontextmanager
+        async def connect():
+            yield self.redis
+
+        patcher = mock.patch.object(poll_scheduler_module.redis_manager, "connect", connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def fetch(self, streamer_id: int) -> list[float] | None:
+        if streamer_id == 3:
+            self.stalled.set()
+            await asyncio.Event().wait()
+
+        if streamer_id == 2:
+            return None
+
+        return [float(streamer_id)]
+
+    def cached(self) -> dict[str, list[float]]:
+        return {
+            call.args[0]: json.loads(call.args[1])
+            for call in self.redis.set.await_args_list
+        }
+
+    async def test_caches_each_schedule_as_it_arrives(self):
+        scheduler = PollScheduler()
+
+        with mock.patch.object(scheduler, "_fetch_scheduled_starts", self.fetch):
+            task = asyncio.create_task(scheduler.refresh_scheduled_starts([1, 2, 3, 4]))
+
+            # The activity timeout cancels the refresh while a fetch is still pending
+            await self.stalled.wait()
+            await asyncio.sleep(0)
+
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self.assertEqual(self.cached(), {"stream_schedule:1": [1.0], "stream_schedule:4": [4.0]})
+
+    async def test_returns_fetched_schedules(self):
+        scheduler = PollScheduler()
+
+        with mock.patch.object(scheduler, "_fetch_scheduled_starts", self.fetch):
+            starts = await scheduler.refresh_scheduled_starts([1, 2, 4])
+
+        self.assertEqual(starts, {1: [1.0], 4: [4.0]})
+        self.assertEqual(self.cached(), {"stream_schedule:1": [1.0], "stream_schedule:4": [4.0]})
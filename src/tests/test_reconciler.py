@@ -0,0 +1,56 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from applications.twitch_webhook.twitch.reconciler import EventSubscription, SubscriptionReconciler
+
+
+def existing(
+    id: str,
+    status: str = "enabled",
+    callback: str = "http://localhost/callback",
+    broadcaster_user_id: str = "1"
+):
+    return SimpleNamespace(
+        id=id,
+        type="stream.online",
+        version="1",
+        condition={"broadcaster_user_id": broadcaster_user_id},
+        status=status,
+        transport={"method": "webhook", "callback": callback}
+    )
+
+
+DESIRED = [
+    EventSubscription(type="stream.online", version="1", condition={"broadcaster_user_id": "1"}),
+    EventSubscription(type="stream.offline", version="1", condition={"broadcaster_user_id": "1"}),
+]
+
+
+class SubscriptionReconcilerTest(unittest.IsolatedAsyncioTestCase):
+    def create_reconciler(self, is_reusable) -> SubscriptionReconciler:
+        return SubscriptionReconciler(mock.AsyncMock(), mock.AsyncMock(), is_reusable)
+
+    def test_diff_keeps_pending_and_ignores_unmanaged(self):
+        reconciler = self.create_reconciler(lambda sub: sub.transport["callback"] == "http://localhost/callback")
+
+        missing, stale = reconciler.diff(DESIRED, [
+            existing("pending", status="webhook_callback_verification_pending"),
+            existing("duplicate"),
+            existing("failed", status="webhook_callback_verification_failed"),
+            existing("moved", callback="http://other/callback"),
+            existing("unmanaged", callback="http://other/callback", broadcaster_user_id="2"),
+            existing("removed", broadcaster_user_id="3"),
+        ])
+
+        self.assertEqual([subscription.type for subscription in missing], ["stream.offline"])
+        self.assertEqual([sub.id for sub in stale], ["duplicate", "failed", "moved", "removed"])
+
+    async def test_create_only_without_reuse_check(self):
+        reconciler = self.create_reconciler(None)
+
+        await reconciler.reconcile(DESIRED)
+
+        reconciler.twitch.get_eventsub_subscriptions.assert_not_called()
+        reconciler.twitch.delete_eventsub_subscription.assert_not_called()
+        self.assertEqual(reconciler.create.await_count, len(DESIRED))
@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+from applications.common.domain.streamers import ChatRule
+from applications.twitch_webhook import triggers
+from applications.twitch_webhook.triggers import DEFAULT_CHAT_RULES, IGNORED_CHATTER_LOGINS, ChatRulesPlan, ChatRulesRegistry
+
+from tests.benchmark_chat_rules import (
+    BENCHMARK_CHAT_RULES, FIXTURE, get_snapshot, load_messages, match_per_rule, to_event
+)
+
+
+def match(plan: ChatRulesPlan, text: str, chatter_login: str = "viewer") -> list[str]:
+    return [rule.name for rule in plan.match(text, chatter_login)]
+
+
+class ChatRulesPlanTest(unittest.TestCase):
+    def test_default_rules(self):
+        plan = ChatRulesPlan(DEFAULT_CHAT_RULES)
+
+        self.assertEqual(match(plan, "!ai привет, булат"), ["ask_ai", "kurbezz"])
+        self.assertEqual(match(plan, "ГОЙДА"), ["goida"])
+        self.assertEqual(match(plan, "kurbezz", "KurBezz"), [])
+        self.assertEqual(match(plan, "здароу"), [])
+
+    def test_group_fires_first_matching_rule_only(self):
+        plan = ChatRulesPlan(DEFAULT_CHAT_RULES)
+
+        self.assertEqual(match(plan, "здароу, сосал? лан я пошёл", "lasqexx_"), ["lasqexx_hello"])
+
+    def test_merged_regex_finds_overlapping_rules(self):
+        plan = ChatRulesPlan([
+            ChatRule(name="foo", regex="foo"),
+            ChatRule(name="foo_bar", regex=r"foo\s+bar"),
+            ChatRule(name="digits", regex=r"\d+"),
+        ])
+
+        self.assertIsNotNone(plan.regex)
+        self.assertEqual(match(plan, "x FOO bar 12"), ["foo", "foo_bar", "digits"])
+
+    def test_global_flags_fall_back_to_separate_patterns(self):
+        plan = ChatRulesPlan([
+            ChatRule(name="inline_flags", regex="(?i)foo"),
+            ChatRule(name="digits", regex=r"\d+"),
+        ])
+
+        self.assertIsNone(plan.regex)
+        self.assertEqual(match(plan, "foo 1"), ["inline_flags", "digits"])
+        self.assertEqual(match(plan, "bar"), [])
+
+    def test_backreferences_and_named_groups_fall_back(self):
+        plan = ChatRulesPlan([
+            ChatRule(name="repeat", regex=r"(a)\1"),
+            ChatRule(name="named", regex=r"(?P<word>bb)"),
+        ])
+
+        self.assertIsNone(plan.regex)
+        self.assertEqual(match(plan, "aa bb"), ["repeat", "named"])
+
+    def test_invalid_regex_is_skipped(self):
+        plan = ChatRulesPlan([
+            ChatRule(name="broken", regex="("),
+            ChatRule(name="goida", keywords=["гойда"]),
+        ])
+
+        self.assertEqual([rule.name for rule in plan.rules], ["goida"])
+        self.assertEqual(match(plan, "гойда"), ["goida"])
+
+
+
+class ChatLogReplayTest(unittest.IsolatedAsyncioTestCase):
+    # The benchmark compares matchers on this log, so they must agree on every message
+    def test_plan_matches_per_rule_reference(self):
+        merged = ChatRulesPlan(BENCHMARK_CHAT_RULES)
+        per_rule_regex = ChatRulesPlan(BENCHMARK_CHAT_RULES)
+        per_rule_regex.regex = None
+
+        for message in load_messages(FIXTURE):
+            expected = [
+                rule.name
+                for rule in match_per_rule(BENCHMARK_CHAT_RULES, message["text"], message["chatter_user_login"])
+            ]
+
+            with self.subTest(text=message["text"]):
+                self.assertEqual(match(merged, message["text"], message["chatter_user_login"]), expected)
+                self.assertEqual(match(per_rule_regex, message["text"], message["chatter_user_login"]), expected)
+
+    async def test_should_dispatch_matches_per_rule_reference(self):
+        registry = ChatRulesRegistry(IGNORED_CHATTER_LOGINS)
+        snapshot = get_snapshot(BENCHMARK_CHAT_RULES)
+
+        with mock.patch.object(triggers.streamers_cache, "get", mock.AsyncMock(return_value=snapshot)):
+            for message in load_messages(FIXTURE):
+                expected = message["chatter_user_login"] not in IGNORED_CHATTER_LOGINS and (
+                    message["is_reply"]
+                    or bool(match_per_rule(BENCHMARK_CHAT_RULES, message["text"], message["chatter_user_login"]))
+                )
+
+                with self.subTest(text=message["text"]):
+                    self.assertEqual(await registry.should_dispatch(to_event(message)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+
+from applications.common.domain.streamers import IntegrationsConfig, NotificationsConfig, StreamerConfig, TwitchConfig
+from applications.common.repositories import streamers
+from applications.common.repositories.streamers import StreamersSnapshot
+from applications.twitch_webhook.twitch import webhook
+from applications.twitch_webhook.twitch.webhook import TwitchService
+
+
+def get_streamer(id: int, chatbot_in_chats: list[int] | None = None) -> StreamerConfig:
+    return StreamerConfig(
+        twitch=TwitchConfig(id=id, name=f"streamer{id}"),
+        notifications=NotificationsConfig(start_stream="started"),
+        integrations=IntegrationsConfig(),
+        chatbot_in_chats=chatbot_in_chats
+    )
+
+
+STREAMERS = [
+    get_streamer(1, [1, 100]),
+    get_streamer(2, [100]),
+    get_streamer(3),
+]
+
+SNAPSHOT = StreamersSnapshot({streamer.twitch.id: streamer for streamer in STREAMERS})
+
+
+class ChatDispatchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = mock.AsyncMock()
+
+        for patcher in (
+            mock.patch.object(streamers.streamers_cache, "get", mock.AsyncMock(return_value=SNAPSHOT)),
+            mock.patch.object(webhook.MessageEvent, "from_twitch_event", mock.Mock()),
+            mock.patch.object(webhook.chat_rules, "should_dispatch", mock.AsyncMock(return_value=True)),
+            mock.patch.object(webhook, "get_client", mock.AsyncMock(return_value=self.client)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def receive(self, streamer: StreamerConfig, chat_id: int):
+        event = mock.Mock()
+        event.event.broadcaster_user_id = str(chat_id)
+
+        await TwitchService(streamer).on_message(event)
+
+    def test_snapshot_indexes_chatbots_by_chat(self):
+        self.assertEqual([streamer.twitch.id for streamer in SNAPSHOT.by_chatbot_chat_id[100]], [1, 2])
+        self.assertEqual([streamer.twitch.id for streamer in SNAPSHOT.by_chatbot_chat_id[1]], [1])
+        self.assertNotIn(3, SNAPSHOT.by_chatbot_chat_id)
+
+    async def test_dispatches_chats_the_bot_is_configured_in(self):
+        await self.receive(STREAMERS[1], 100)
+
+        self.client.start_workflow.assert_awaited_once()
+
+    async def test_drops_chats_the_bot_has_left(self):
+        await self.receive(STREAMERS[2], 100)
+        await self.receive(STREAMERS[1], 1)
+
+        self.client.start_workflow.assert_not_awaited()